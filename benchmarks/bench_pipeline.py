@@ -0,0 +1,179 @@
+"""
+Офлайн-бенчмарк разбора, фильтрации и форматирования акций.
+
+Запуск из корня проекта (сеть и .env не нужны):
+    python benchmarks/bench_pipeline.py --blocks 500 --products 4 --spread 60
+
+Замеряет путь, по которому идут кнопки бота: load_offers → index_sheet → индексы дат →
+cached_render → отправка (подставной бот), для акций по категориям и текстов «для отправки»,
+с пустыми кэшами (холодный) и из кэша готовых сообщений.
+
+Для каждого этапа выводит время вызова, строк/с и память по tracemalloc:
+пик за вызов и сколько блоков памяти осталось занято после вызова (кэши, результаты).
+
+Запросы по диапазону дат (OfferTable.active_on, overlapping) дополнительно замеряются на растущей
+истории (--history 1,4,16: во столько раз больше акций и шире разброс дат) рядом с перебором
+списка акций и со словарным поиском точного дня (starting_on, ending_on).
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+from pathlib import Path
+from datetime import date, timedelta
+
+# Заглушки переменных окружения: модули бота читают их при импорте
+for name, value in {
+    "BOT_TOKEN": "0:bench", "CHAT_ID": "0", "SPREADSHEET_ID": "bench",
+    "SCOPES": "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "ALLOWED_USERS": "0", "ADMIN_ID": "0", "BLOCKED_USERS": "0", "NOTIFY_USER_ID": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bot.logic as logic
+import bot.offers as offers
+from benchmarks.synthetic import generate_sheets
+
+
+# === Подставной бот: ничего не отправляет, только считает сообщения ===
+class NullBot:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+
+def _reset_caches():
+    offers._parsed.clear()
+    offers._tables.clear()
+    logic._rendered.clear()
+
+
+def measure(func, repeat):
+    """
+    Возвращает (среднее время вызова, пик памяти в байтах, прирост числа блоков памяти за вызов).
+    """
+    func()   # Прогрев
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    return elapsed, peak, allocations
+
+
+def history_stages(factor, args, today):
+    """
+    Этапы запросов по датам для истории в factor раз больше базовой.
+    """
+    year = today.year
+    week_later = today + timedelta(days=7)
+    sheets = generate_sheets(args.blocks * factor, args.products, args.spread * factor, today, args.seed)
+    history_rows = sum(len(sheet_rows) for sheet_rows in sheets.values())
+    indexed = [
+        offers.SheetOffers(name, offers.parse_offers(sheet_rows, name, offers.skip_rows_for(name), year), year, sheet_rows)
+        for name, sheet_rows in sheets.items()
+    ]
+
+    def active_by_scan():
+        return {
+            sheet.category: [offer for offer in sheet.offers if offer.start and offer.end and offer.start <= today <= offer.end]
+            for sheet in indexed
+        }
+
+    return [
+        (f"OfferTable (построение, ×{factor})", history_rows, lambda: offers.OfferTable(indexed)),
+        (f"offer_table.active_on (×{factor})", history_rows, lambda: offers.offer_table(indexed).active_on(today)),
+        (f"offer_table.overlapping 7 дней (×{factor})", history_rows,
+         lambda: offers.offer_table(indexed).overlapping(today, week_later)),
+        (f"active_on перебором списка (×{factor})", history_rows, active_by_scan),
+        (f"starting_on по индексу (×{factor})", history_rows, lambda: offers.starting_on(indexed, today)),
+        (f"ending_on по индексу (×{factor})", history_rows, lambda: offers.ending_on(indexed, today)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора и форматирования акций")
+    parser.add_argument("--blocks", type=int, default=300, help="Акций на лист")
+    parser.add_argument("--products", type=int, default=3, help="Товаров в акции")
+    parser.add_argument("--spread", type=int, default=30, help="Разброс дат начала, ± дней")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на этап")
+    parser.add_argument("--history", default="1,4,16", help="Множители истории для OfferTable, через запятую")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    today = date.today()
+    sheets = generate_sheets(args.blocks, args.products, args.spread, today, args.seed)
+    total_rows = sum(len(sheet_rows) for sheet_rows in sheets.values())
+    today_str = today.strftime("%d.%m.%Y")
+
+    # Листы отдаются из памяти вместо Google
+    async def fake_sheets(sheet_names):
+        return {name: sheets[name] for name in sheet_names}
+    logic.get_sheets_data_async = fake_sheets
+
+    null_bot = NullBot()
+
+    def index_all():
+        offers._parsed.clear()
+        for name, sheet_rows in sheets.items():
+            offers.index_sheet(name, sheet_rows)
+
+    def load_all():
+        offers._parsed.clear()
+        asyncio.run(logic.load_offers(list(sheets)))
+
+    # Обработчики кнопок: (название, вызов с подставным ботом)
+    flows = [
+        ("send_today_offers", lambda: logic.send_today_offers(null_bot, 0)),
+        ("send_expired_offers", lambda: logic.send_expired_offers(null_bot, 0, today)),
+        ("send_formatted_new_offers", lambda: logic.send_formatted_new_offers(null_bot, 0, today_str)),
+        ("send_formatted_expired_offers", lambda: logic.send_formatted_expired_offers(null_bot, 0, today_str)),
+    ]
+
+    def cold(flow):
+        def run():
+            _reset_caches()
+            asyncio.run(flow())
+        return run
+
+    def warm(flow):
+        return lambda: asyncio.run(flow())
+
+    stages = [
+        ("index_sheet (3 листа)", total_rows, index_all),
+        ("load_offers (3 листа)", total_rows, load_all),
+    ]
+    for name, flow in flows:
+        stages.append((f"{name} (холодный)", total_rows, cold(flow)))
+        stages.append((f"{name} (из кэша)", total_rows, warm(flow)))
+
+    # OfferTable на растущей истории: больше акций, шире разброс дат
+    for factor in (int(value) for value in args.history.split(",")):
+        stages += history_stages(factor, args, today)
+
+    print(f"Листы: 3 × {args.blocks} акций, {args.products} товара в акции, строк всего: {total_rows}")
+    print(f"{'Этап':<40}{'мс/вызов':>12}{'строк/с':>18}{'пик, КБ':>12}{'блоков':>12}")
+    for name, row_count, func in stages:
+        elapsed, peak, allocations = measure(func, args.repeat)
+        rate = row_count / elapsed if elapsed else float("inf")
+        print(f"{name:<40}{elapsed * 1000:>12.3f}{rate:>18,.0f}{peak / 1024:>12.1f}{allocations:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Нагрузочный тест обработчиков бота без Telegram и Google.
+
+Синтетические апдейты с заданной частотой проходят через PerChatUpdateProcessor
+в bot.handlers.handle_message и handle_date_input. Отправка сообщений записывается
+подставным ботом, листы отдаёт подставной backend с задержкой (кэш, объединение
+запросов и пул потоков utils/google_sheets работают как в боте).
+
+Запуск из корня проекта:
+    python benchmarks/load_test.py --rate 50 --duration 20 --users 200 --sheets-latency 0.8
+
+Логи, статистика и снимок листов пишутся во временную папку, а не в logs/ проекта.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from datetime import datetime, timezone
+from collections import defaultdict
+from types import SimpleNamespace
+
+# Заглушки переменных окружения: модули бота читают их при импорте
+for name, value in {
+    "BOT_TOKEN": "0:load", "CHAT_ID": "0", "SPREADSHEET_ID": "load",
+    "SCOPES": "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "ALLOWED_USERS": "0", "ADMIN_ID": "1", "BLOCKED_USERS": "0", "NOTIFY_USER_ID": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+# Файлы бота (logs/...) создаются относительно текущей папки
+os.chdir(tempfile.mkdtemp(prefix="stocks_bot_load_"))
+
+from telegram import Update, Message, Chat, User
+
+import utils.google_sheets as google_sheets
+from utils.concurrency import PerChatUpdateProcessor
+from utils.logger import stop_activity_logging
+from bot.handlers import handle_message, handle_date_input
+from benchmarks.synthetic import generate_sheets
+
+# Кнопки, которые нажимают пользователи (ввод даты — отдельный сценарий)
+BUTTONS = [
+    "🥤 Акции Напитки",
+    "🥡 Акции Снеки",
+    "💧💨 Акции Аромки",
+    "📦 Все акции",
+    "🆕 Новые акции",
+    "📴 Завершённые акции",
+    "🟢 Новые акции для отправки",
+    "🔴 Завершённые акции для отправки",
+    "🆕 Новые акции на дату",
+    "📴 Завершённые акции на дату",
+]
+DATE_INPUT = "📅 ввод даты"
+
+
+# === Подставной бот: записывает отправленные сообщения ===
+class RecordingBot:
+    def __init__(self, latency):
+        self.latency = latency
+        self.sent = defaultdict(int)   # chat_id -> число сообщений
+        self.chars = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent[chat_id] += 1
+        self.chars += len(text)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        await self.send_message(chat_id, "")
+
+
+# === Подставной backend Google Таблицы ===
+class FakeSheets:
+    def __init__(self, sheets, latency):
+        self.sheets = sheets
+        self.latency = latency
+        self.requests = 0
+
+    def fetch(self, sheet_names):
+        # Вызывается из пула потоков utils/google_sheets, как настоящий batchGet
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {name: self.sheets.get(name, []) for name in sheet_names}
+
+
+def make_update(update_id, user_id, text, bot):
+    user = User(id=user_id, first_name="Load", last_name=str(user_id), is_bot=False, username=f"load{user_id}")
+    chat = Chat(id=user_id, type=Chat.PRIVATE)
+    message = Message(message_id=update_id, date=datetime.now(timezone.utc), chat=chat, from_user=user, text=text)
+    message.set_bot(bot)
+    return Update(update_id=update_id, message=message)
+
+
+def percentile(values, q):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run(args):
+    fake_sheets = FakeSheets(
+        generate_sheets(args.blocks, args.products, args.spread, seed=args.seed), args.sheets_latency
+    )
+    google_sheets.fetch_sheets_data = fake_sheets.fetch
+    google_sheets.SHEETS_CACHE_TTL = args.cache_ttl
+
+    bot = RecordingBot(args.send_latency)
+    processor = PerChatUpdateProcessor(args.concurrency)
+    user_data = defaultdict(dict)   # user_id -> context.user_data
+    latencies = defaultdict(list)   # кнопка -> задержки, секунды
+    errors = defaultdict(int)
+    rng = random.Random(args.seed)
+
+    async def timed(update, button, scheduled_at):
+        # Время замеряется внутри обработки: апдейт может ждать в очереди своего чата
+        context = SimpleNamespace(bot=bot, user_data=user_data[update.effective_user.id])
+        handler = handle_date_input if button == DATE_INPUT else handle_message
+        try:
+            await handler(update, context)
+        except Exception:
+            errors[button] += 1
+        finally:
+            latencies[button].append(time.perf_counter() - scheduled_at)
+
+    async def handle(update, button, scheduled_at):
+        await processor.process_update(update, timed(update, button, scheduled_at))
+
+    total = int(args.rate * args.duration)
+    tasks = []
+    started = time.perf_counter()
+    for update_id in range(total):
+        scheduled_at = started + update_id / args.rate
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        user_id = 1000 + rng.randrange(args.users)
+        button = DATE_INPUT if rng.random() < args.date_share else rng.choice(BUTTONS)
+        text = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}" if button == DATE_INPUT else button
+        update = make_update(update_id, user_id, text, bot)
+        tasks.append(asyncio.create_task(handle(update, button, scheduled_at)))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    # === Отчёт ===
+    print(f"Апдейтов: {total} за {elapsed:.2f} с — {total / elapsed:.1f} апд/с "
+          f"(цель {args.rate}/с, пользователей {args.users}, параллельно {args.concurrency})")
+    print(f"Сообщений отправлено: {sum(bot.sent.values())}, символов: {bot.chars:,}, "
+          f"запросов к листам: {fake_sheets.requests}")
+    print(f"{'Кнопка':<36}{'кол-во':>8}{'ошибок':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+
+    all_latencies = []
+    for button in BUTTONS + [DATE_INPUT]:
+        values = sorted(latencies.get(button, []))
+        if not values:
+            continue
+        all_latencies += values
+        print(f"{button:<36}{len(values):>8}{errors[button]:>8}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}")
+
+    all_latencies.sort()
+    print(f"{'Всего':<36}{len(all_latencies):>8}{sum(errors.values()):>8}"
+          f"{percentile(all_latencies, 50) * 1000:>10.1f}{percentile(all_latencies, 95) * 1000:>10.1f}"
+          f"{percentile(all_latencies, 99) * 1000:>10.1f}{all_latencies[-1] * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест обработчиков бота")
+    parser.add_argument("--rate", type=float, default=20, help="Апдейтов в секунду")
+    parser.add_argument("--duration", type=float, default=10, help="Длительность, секунды")
+    parser.add_argument("--users", type=int, default=100, help="Число разных пользователей")
+    parser.add_argument("--concurrency", type=int, default=16, help="Как CONCURRENT_UPDATES")
+    parser.add_argument("--date-share", type=float, default=0.1, help="Доля апдейтов с вводом даты")
+    parser.add_argument("--sheets-latency", type=float, default=0.5, help="Задержка ответа Google, секунды")
+    parser.add_argument("--send-latency", type=float, default=0.05, help="Задержка send_message, секунды")
+    parser.add_argument("--cache-ttl", type=float, default=60, help="SHEETS_CACHE_TTL на время теста")
+    parser.add_argument("--blocks", type=int, default=300, help="Акций на лист")
+    parser.add_argument("--products", type=int, default=3, help="Товаров в акции")
+    parser.add_argument("--spread", type=int, default=30, help="Разброс дат начала, ± дней")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    finally:
+        stop_activity_logging()
+
+
+if __name__ == "__main__":
+    main()
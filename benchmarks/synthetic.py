@@ -0,0 +1,58 @@
+import random
+from datetime import date, timedelta
+
+# === Генератор синтетических листов с акциями ===
+# Повторяет раскладку настоящих листов: служебные строки сверху, блоки акций
+# через пустую строку, колонки A–F (дата внесения, период, товары, скидка, участники, исключения).
+
+HEADER_ROWS = {
+    "Акции Аромки": [["Аромки"], ["Дата внесения", "Период", "Товары", "Механика", "Участники", "Исключения"]],
+    "Акции Снеки": [["Снеки"], ["Дата внесения", "Период", "Товары", "Механика", "Участники", "Исключения"]],
+    "Акции Напитки": [["Дата внесения", "Период", "Товары", "Механика", "Участники", "Исключения"]],
+}
+
+PRODUCTS = ["Чипсы Lay's 120г", "Сухарики Хрусteam", "Cola 0.5л", "Fanta 1л", "Вода Моршинська 1.5л",
+            "Арахис 200г", "Жидкость Chaser 30мл", "Картридж Vaporesso", "Энергетик Monster", "Сок Sandora 1л"]
+DISCOUNTS = ["-10%", "-15%", "-20%", "1+1", "2 по цене 1", "-25%"]
+PARTICIPANTS = ["Все магазины", "Киев", "Львов, Одесса", "Только ТЦ"]
+EXCEPTIONS = ["", "", "", "нет", "ул. Шевченко 1\nпр. Победы 10"]
+
+
+def generate_sheet(category, blocks=200, products=3, spread=30, today=None, seed=0):
+    """
+    Строки листа category: blocks акций по products товаров (часть — в основной строке,
+    часть — в дополнительных строках блока), даты начала в пределах ±spread дней от today.
+    """
+    rng = random.Random(f"{seed}:{category}")
+    today = today or date.today()
+    rows = [list(row) for row in HEADER_ROWS.get(category, [["Заголовок"]])]
+
+    for _ in range(blocks):
+        start = today + timedelta(days=rng.randint(-spread, spread))
+        end = start + timedelta(days=rng.randint(1, 14))
+        added = start - timedelta(days=rng.randint(1, 7))
+        names = [rng.choice(PRODUCTS) for _ in range(max(products, 1))]
+        in_main = names[:max(len(names) // 2, 1)]
+
+        rows.append([
+            added.strftime("%d.%m"),
+            f"{start.strftime('%d.%m')} - {end.strftime('%d.%m')}",
+            "\n".join(in_main),
+            rng.choice(DISCOUNTS),
+            rng.choice(PARTICIPANTS),
+            rng.choice(EXCEPTIONS),
+        ])
+        rows += [["", "", name] for name in names[len(in_main):]]
+        rows.append([])
+
+    return rows
+
+
+def generate_sheets(blocks=200, products=3, spread=30, today=None, seed=0):
+    """
+    Все три листа: {название листа: строки}.
+    """
+    return {
+        category: generate_sheet(category, blocks, products, spread, today, seed)
+        for category in HEADER_ROWS
+    }
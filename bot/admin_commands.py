@@ -7,8 +7,13 @@ from datetime import datetime
 import json
 from utils.decorators import admin_only
 from utils.stats import load_stats
+from utils.google_sheets import invalidate_sheet_cache
+from utils.user_registry import user_count
+from utils.logger import flush_activity_log
+from utils.metrics import render_summary
+from utils.chunker import split_text
+from utils.profiling import start_profiling, stop_profiling
 from datetime import datetime
-import re
 
 
 
@@ -23,32 +28,13 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         stats = load_stats()
 
-        # === 1. Уникальные пользователи всего из users_list.log ===
-        users_log_path = Path("logs/users_list.log")
-        all_user_ids = set()
-        if users_log_path.exists():
-            with open(users_log_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    match = re.search(r"UserID:\s*(\d+)", line)
-                    if match:
-                        all_user_ids.add(match.group(1))
-
-        total_unique_users = len(all_user_ids)
-
-        # === 2. Уникальные пользователи за сегодня ===
-        today = datetime.now().date()
-        today_users = set()
-        uses_today = 0
-
-        for record in stats.get("last_users", []):
-            time_str = record.get("time")
-            try:
-                record_date = datetime.fromisoformat(time_str).date()
-                if record_date == today:
-                    today_users.add(record.get("user_id"))
-                    uses_today += 1
-            except Exception:
-                continue
+        # === 1. Уникальные пользователи всего (реестр в памяти) ===
+        total_unique_users = user_count()
+
+        # === 2. Уникальные пользователи и использования за сегодня (дневные счётчики) ===
+        today = datetime.now().date().isoformat()
+        today_users = stats.get("users_by_day", {}).get(today, [])
+        uses_today = stats.get("visits_by_day", {}).get(today, 0)
 
         msg = (
             "📊 <b>Статистика:</b>\n"
@@ -85,6 +71,9 @@ async def last_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 @admin_only
 async def log_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
+        # Дописываем буфер журнала, чтобы в файле были последние действия
+        flush_activity_log()
+
         log_path = Path("logs/user_activity.log")
         if log_path.exists():
             await update.message.reply_document(document=log_path.open("rb"))
@@ -100,3 +89,46 @@ async def version_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"🛠 Версия бота: {VERSION}")
     except Exception as e:
         await update.message.reply_text(f"⚠️ Ошибка при выводе версии: {e}")
+
+# === Команда /refresh — сброс кэша Google Таблицы ===
+@admin_only
+async def refresh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        invalidate_sheet_cache()
+        await update.message.reply_text("🔄 Кэш акций сброшен, данные будут загружены заново.")
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ Ошибка при сбросе кэша: {e}")
+
+# === Команда /metrics — метрики производительности ===
+@admin_only
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        for part in split_text(render_summary()):
+            await update.message.reply_text(part)
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ Ошибка при выводе метрик: {e}")
+
+# === Команда /profile on [N] | off — профилирование следующих N апдейтов ===
+@admin_only
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        args = context.args or []
+        mode = args[0].lower() if args else ""
+
+        if mode == "on":
+            count = int(args[1]) if len(args) > 1 else 10
+            if start_profiling(count, update.effective_chat.id):
+                await update.message.reply_text(f"🔬 Профилирование включено для следующих {count} апдейтов.")
+            else:
+                await update.message.reply_text("🔬 Профилирование уже идёт. Остановить: /profile off")
+
+        elif mode == "off":
+            if not await stop_profiling(context.bot):
+                await update.message.reply_text("🔬 Профилирование не было включено.")
+
+        else:
+            await update.message.reply_text("Использование: /profile on [N] или /profile off")
+    except ValueError:
+        await update.message.reply_text("❌ N должно быть числом: /profile on 20")
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ Ошибка профилирования: {e}")
@@ -1,4 +1,6 @@
 import os
+from datetime import datetime
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 
 
@@ -34,6 +36,31 @@ try:
     # Ban users
     BLOCKED_USERS = list(map(int, os.getenv("BLOCKED_USERS", "").split(",")))
 
+    # Сколько апдейтов обрабатывать одновременно (1 — строго по очереди)
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "16"))
+    if CONCURRENT_UPDATES < 1:
+        raise ValueError("❌ CONCURRENT_UPDATES должен быть не меньше 1")
+
+    # Режим получения апдейтов: polling (по умолчанию) или webhook
+    BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+    if BOT_MODE not in ("polling", "webhook"):
+        raise ValueError("❌ BOT_MODE должен быть polling или webhook")
+
+    # Настройки webhook (используются только при BOT_MODE=webhook)
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")    # Адрес, на котором слушает сервер
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")                   # Публичный адрес; пусто — setWebhook не вызывается
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")             # Проверяется в заголовке X-Telegram-Bot-Api-Secret-Token
+    if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+        raise ValueError("❌ Для BOT_MODE=webhook укажите WEBHOOK_SECRET в .env")
+
+    # Время ежедневной сводки подписчикам (ЧЧ:ММ) и часовой пояс (IANA, пусто — как на сервере).
+    # По этому же поясу кнопки определяют «сегодня»
+    DIGEST_TIME = datetime.strptime(os.getenv("DIGEST_TIME", "09:00"), "%H:%M").time()
+    DIGEST_TIMEZONE = os.getenv("DIGEST_TIMEZONE", "")
+    DIGEST_TZ = ZoneInfo(DIGEST_TIMEZONE) if DIGEST_TIMEZONE else datetime.now().astimezone().tzinfo
+
 except ValueError as ve:
     print(ve)
     # При критической ошибке можно вызвать exit(1), чтобы не запускать бота
@@ -1,10 +1,13 @@
 from telegram.ext import ContextTypes
 from telegram import Update, ReplyKeyboardMarkup, Bot
 from datetime import datetime
+from dataclasses import dataclass
+from typing import Callable
 
 
 # Импорт логики обработки кнопок
 from bot.logic import (
+    send_aromki_full,
     send_sneki_full,
     send_drinks_full,
     send_today_offers,
@@ -15,6 +18,8 @@ from bot.logic import (
     send_expired_offers_by_date,
     send_formatted_new_offers,
     send_formatted_expired_offers,
+    send_stale_notice,
+    get_local_today,
 )
 from bot.admin_commands import (
     stats_command,
@@ -29,12 +34,12 @@ from bot.config import ALLOWED_USERS, ADMIN_ID, BLOCKED_USERS
 
 # Логирование действий пользователей
 from utils.stats import update_stats
-from utils.logger import log_user_activity, log_new_user, log_user_action_to_personal_file
+from utils.logger import log_new_user, log_user_action
+from utils import metrics
 
 
-# Формирование сообщений для "Аромок"
-from bot.messages import format_aromki_message
-from utils.google_sheets import get_sheet_data
+# Загрузка листов Google Таблицы
+from utils.google_sheets import get_sheets_data_async
 
 
 # === Команда /start ===
@@ -73,7 +78,7 @@ from datetime import datetime
 
 async def handle_date_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_input = update.message.text.strip()
-    today_year = datetime.now().year
+    today_year = get_local_today().year
 
     # Попробуем разобрать дату в разных форматах
     parsed_date = None
@@ -113,159 +118,156 @@ async def handle_date_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
+# === Действия кнопок ===
+# Все действия принимают (update, context, chosen_date), чтобы вызываться одинаково
+async def _drinks(update, context, chosen_date):
+    await send_drinks_full(context.bot, update.effective_chat.id)
+
+
+async def _sneki(update, context, chosen_date):
+    await send_sneki_full(context.bot, update.effective_chat.id)
+
+
+async def _aromki(update, context, chosen_date):
+    await send_aromki_full(context.bot, update.effective_chat.id)
+
+
+async def _all_offers(update, context, chosen_date):
+    # Загружаем все три листа одним запросом, дальше они берутся из кэша
+    sheet_names = ["Акции Аромки", "Акции Снеки", "Акции Напитки"]
+    await get_sheets_data_async(sheet_names)
+    await send_aromki_full(context.bot, update.effective_chat.id, notice=False)
+    await send_sneki_full(context.bot, update.effective_chat.id, notice=False)
+    await send_drinks_full(context.bot, update.effective_chat.id, notice=False)
+    # Предупреждение об устаревших данных — одно на все три листа
+    await send_stale_notice(context.bot, update.effective_chat.id, sheet_names)
+
+
+async def _formatted_new(update, context, chosen_date):
+    await send_formatted_new_offers(context.bot, update.effective_chat.id, chosen_date)
+
+
+async def _formatted_expired(update, context, chosen_date):
+    await send_formatted_expired_offers(context.bot, update.effective_chat.id, chosen_date)
+
+
+async def _today(update, context, chosen_date):
+    await send_today_offers(context.bot, update.effective_chat.id)
+
+
+async def _expired(update, context, chosen_date):
+    await send_expired_offers(context.bot, update.effective_chat.id)
+
+
+async def _new_by_date(update, context, chosen_date):
+    if chosen_date:
+        await send_new_offers_by_date(context.bot, update.effective_chat.id, chosen_date)
+    else:
+        await update.message.reply_text("⚠️ Сначала введите дату в формате ДД.ММ.")
+
+
+async def _expired_by_date(update, context, chosen_date):
+    if chosen_date:
+        await send_expired_offers_by_date(context.bot, update.effective_chat.id, chosen_date)
+    else:
+        await update.message.reply_text("⚠️ Сначала введите дату в формате ДД.ММ.")
+
+
+def _command(func):
+    """
+    Оборачивает обработчик команды (update, context) в действие кнопки.
+    """
+    async def action(update, context, chosen_date):
+        await func(update, context)
+    return action
+
+
+# === Реестр кнопок: текст -> действие, логирование ===
+# Доступ к командам админа проверяет сам обработчик (@admin_only в bot/admin_commands.py)
+@dataclass(frozen=True, slots=True)
+class Button:
+    action: Callable
+    log: bool = True      # Писать нажатие в журнал активности и статистику (не нужно для навигации)
+
+
+BUTTONS = {
+    "🥤 Акции Напитки": Button(_drinks),
+    "🥡 Акции Снеки": Button(_sneki),
+    "💧💨 Акции Аромки": Button(_aromki),
+    "📦 Все акции": Button(_all_offers),
+    "🟢 Новые акции для отправки": Button(_formatted_new),
+    "🔴 Завершённые акции для отправки": Button(_formatted_expired),
+    "🆕 Новые акции": Button(_today),
+    "📴 Завершённые акции": Button(_expired),
+    "🆕 Новые акции на дату": Button(_new_by_date),
+    "📴 Завершённые акции на дату": Button(_expired_by_date),
+    "⬅️ Назад": Button(_command(start), log=False),
+    "📊 Статистика": Button(_command(stats_command)),
+    "🧾 Последние пользователи": Button(_command(last_users_command)),
+    "📁 Логи": Button(_command(log_command)),
+    "ℹ️ Версия бота": Button(_command(version_command)),
+}
+
+
+def _looks_like_date(text):
+    return any(sep in text for sep in [".", "-"]) and any(char.isdigit() for char in text)
+
+
 # === Обработка всех входящих сообщений ===
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Общие шаги (учёт пользователя, журнал, блокировка) выполняются здесь один раз,
+    затем действие кнопки выбирается по тексту из BUTTONS.
+    """
     try:
         user = update.effective_user
         user_id = user.id
         text = update.message.text.strip()
+        button = BUTTONS.get(text)
 
-        # Логгируем нового пользователя и обновляем статистику
-        log_new_user({
-            "id": user.id,
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name
-        })
-        update_stats(user.id, user.username, text)
+        # Дату читаем один раз: дальше обработчик работает со своей копией
+        chosen_date = context.user_data.get("chosen_date")
 
-        # Логгируем действия
-        log_user_activity({
+        user_data = {
             "id": user.id,
             "username": user.username,
             "first_name": user.first_name,
             "last_name": user.last_name
-        }, text)
+        }
 
-        # Логгируем в персональный лог
-        await log_user_action_to_personal_file({
-            "id": user.id,
-            "username": user.username,
-            "first_name": user.first_name,
-            "last_name": user.last_name
-        }, text)
+        # Логгируем нового пользователя
+        log_new_user(user_data)
+
+        # Статистика и журнал (одной записью: общий журнал + персональный лог)
+        if button is None or button.log:
+            update_stats(user.id, user.username, text)
+            await log_user_action(user_data, text, bot=context.bot)
 
         # Блокировка
         if is_blocked(user_id):
             await update.message.reply_text("⛔️ У вас нет доступа к этому боту.")
             return
 
-        # === Обработка команд ===
-        if text == "🥤 Акции Напитки":
-            await send_drinks_full(context.bot, update.effective_chat.id)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "🥡 Акции Снеки":
-            await send_sneki_full(context.bot, update.effective_chat.id)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "💧💨 Акции Аромки":
-            aromki_rows = get_sheet_data("Акции Аромки")
-            msg = format_aromki_message(aromki_rows)
-            await send_long(context.bot, update.effective_chat.id, msg)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "📦 Все акции":
-            aromki_rows = get_sheet_data("Акции Аромки")
-            msg = format_aromki_message(aromki_rows)
-            await send_long(context.bot, update.effective_chat.id, msg)
-            await send_sneki_full(context.bot, update.effective_chat.id)
-            await send_drinks_full(context.bot, update.effective_chat.id)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-        elif text == "🟢 Новые акции для отправки":
-            await send_formatted_new_offers(context.bot, update.effective_chat.id, context)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "🔴 Завершённые акции для отправки":
-            await send_formatted_expired_offers(context.bot, update.effective_chat.id, context)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "🆕 Новые акции":
-            await send_today_offers(context.bot, update.effective_chat.id)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "📴 Завершённые акции":
-            await send_expired_offers(context.bot, update.effective_chat.id)
-            await log_user_action_to_personal_file(
-                user_data=update.effective_user.to_dict(),
-                action=update.message.text,
-                bot=context.bot  # ✅ берём bot из context
-            )
-
-        elif text == "🆕 Новые акции на дату":
-            date = context.user_data.get("chosen_date")
-            if date:
-                await send_new_offers_by_date(context.bot, update.effective_chat.id, date)
-                await log_user_action_to_personal_file(
-                    user_data=update.effective_user.to_dict(),
-                    action=update.message.text,
-                    bot=context.bot  # ✅ берём bot из context
-                )
-            else:
-                await update.message.reply_text("⚠️ Сначала введите дату в формате ДД.ММ.")
-
-        elif text == "📴 Завершённые акции на дату":
-            date = context.user_data.get("chosen_date")
-            if date:
-                await send_expired_offers_by_date(context.bot, update.effective_chat.id, date)
-                await log_user_action_to_personal_file(
-                    user_data=update.effective_user.to_dict(),
-                    action=update.message.text,
-                    bot=context.bot  # ✅ берём bot из context
-                )
-            else:
-                await update.message.reply_text("⚠️ Сначала введите дату в формате ДД.ММ.")
-
-        elif text == "⬅️ Назад":
-            await start(update, context)
-
-        elif text == "📊 Статистика":
-            await stats_command(update, context)
-
-        elif text == "🧾 Последние пользователи":
-            await last_users_command(update, context)
-
-        elif text == "📁 Логи":
-            await log_command(update, context)
-
-        elif text == "ℹ️ Версия бота":
-            await version_command(update, context)
-
-        elif any(sep in text for sep in [".", "-"]) and any(char.isdigit() for char in text):
-            await handle_date_input(update, context)
+        if button is not None:
+            label = text
+            action = button.action(update, context, chosen_date)
+
+        elif _looks_like_date(text):
+            label = "ввод даты"
+            action = handle_date_input(update, context)
 
         else:
             await update.message.reply_text("🤖 Неизвестная команда. Пожалуйста, выбери из меню.")
+            return
+
+        # Метрики: число нажатий, ошибки и время обработки по каждой кнопке
+        metrics.inc("bot_updates_total", button=label)
+        try:
+            with metrics.timer("bot_handler_seconds", button=label):
+                await action
+        except Exception:
+            metrics.inc("bot_handler_errors_total", button=label)
+            raise
 
     except Exception as e:
         await update.message.reply_text(f"⚠️ Произошла ошибка: {e}")
-
-
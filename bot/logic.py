@@ -1,17 +1,20 @@
-import asyncio
-from telegram.ext import ContextTypes
+import time
 from datetime import datetime, timedelta
-from utils.google_sheets import get_sheet_data
-from bot.messages import format_block, format_all_blocks, format_new_offer_blocks, format_expired_offer_blocks
+from utils.google_sheets import get_sheets_data_async, refresh_sheets_async, get_fallback_state, SHEETS_STALE_NOTICE
+from bot.messages import format_offer, format_aromki_message
+from bot.offers import index_sheet, starting_on, ending_on, skip_rows_for, parse_date
+from utils.chunker import pack_blocks, split_text
+from bot.config import DIGEST_TZ
+from utils import metrics
 
 # === Универсальная отправка длинного текста ===
 async def send_long(bot, chat_id, text, parse_mode="HTML"):
     """
-    Делит длинный текст на части по 4096 символов и отправляет его по частям.
+    Делит длинный текст на части по лимиту Telegram (по границам строк,
+    не разрывая HTML-теги) и отправляет его по частям.
     """
-    MAX_LENGTH = 4096
-    for i in range(0, len(text), MAX_LENGTH):
-        await bot.send_message(chat_id=chat_id, text=text[i:i+MAX_LENGTH], parse_mode=parse_mode)
+    for part in split_text(text):
+        await bot.send_message(chat_id=chat_id, text=part, parse_mode=parse_mode)
 
 
 # === Универсальная отправка блоков с заголовком ===
@@ -19,120 +22,176 @@ async def send_combined_blocks(bot, chat_id, blocks, header):
     """
     Объединяет блоки до лимита и отправляет с заголовком.
     """
-    combined = header
+    await send_messages(bot, chat_id, pack_blocks(blocks, header))
+
+
+# === Предупреждение об устаревших данных ===
+def stale_notice(sheet_names):
+    """
+    Если данные листов старше SHEETS_STALE_NOTICE и взяты не из последней загрузки
+    (Google Таблица не ответила или показан снимок с диска), возвращает строку
+    с временем данных, иначе None. Давно не запрашивавшиеся, но успешно
+    обновляемые в фоне листы предупреждения не дают.
+    """
+    state = get_fallback_state(sheet_names)
+    if state is None:
+        return None
+
+    fetched_at, failed = state
+    if time.time() - fetched_at < SHEETS_STALE_NOTICE:
+        return None
+
+    when = datetime.fromtimestamp(fetched_at).strftime('%d.%m %H:%M')
+    if failed:
+        return f"⏳ Данные от {when}: Google Таблица сейчас недоступна."
+    return f"⏳ Данные от {when} (сохранённая копия): свежие данные ещё загружаются."
+
+
+async def send_stale_notice(bot, chat_id, sheet_names):
+    """
+    Отправляет предупреждение об устаревших данных, если оно нужно.
+    Возраст данных — отдельным сообщением, чтобы не попадал в пересылаемые тексты.
+    """
+    notice = stale_notice(sheet_names)
+    if notice:
+        await bot.send_message(chat_id=chat_id, text=notice)
+
+
+# === Отправка готовых сообщений ===
+async def send_messages(bot, chat_id, messages, parse_mode="HTML", sheet_names=()):
+    # Лимиты Telegram соблюдает TelegramRateLimiter приложения (utils/rate_limiter.py)
+    for msg in messages:
+        await send_long(bot, chat_id, msg, parse_mode=parse_mode)
+
+    if sheet_names:
+        await send_stale_notice(bot, chat_id, sheet_names)
+
+
+# === Загрузка и разбор листов ===
+async def load_offers(sheet_names, fresh=False):
+    """
+    Загружает листы одним запросом и возвращает их разобранными:
+    {название листа: SheetOffers}. Разбор выполняется один раз на версию данных.
+    fresh=True — данные из Google в обход кэша (кэш — только если Google не ответил).
+    """
+    if fresh:
+        sheets = await refresh_sheets_async(list(sheet_names))
+    else:
+        sheets = await get_sheets_data_async(list(sheet_names))
+    return {name: index_sheet(name, sheets[name], skip_rows_for(name)) for name in sheet_names}
+
+
+# === Кэш готовых сообщений: (категория, запрос, дата) -> (версии листов, сообщения) ===
+RENDER_CACHE_SIZE = 256
+_rendered = {}
+
+
+def cached_render(key, sheets, render):
+    """
+    Возвращает готовые тексты сообщений для key. render() вызывается,
+    только если запись отсутствует или данные любого из листов изменились.
+    """
+    versions = tuple(sheet.version for sheet in sheets)
+    cached = _rendered.get(key)
+    if cached and cached[0] == versions:
+        metrics.inc("render_cache_total", result="hit")
+        return cached[1]
+
+    metrics.inc("render_cache_total", result="miss")
+    with metrics.timer("render_seconds", kind=key[0]):
+        messages = render()
+    _rendered.pop(key, None)
+    _rendered[key] = (versions, messages)
+
+    # Выбрасываем самые старые записи
+    while len(_rendered) > RENDER_CACHE_SIZE:
+        del _rendered[next(iter(_rendered))]
+
+    return messages
+
+
+def _render_by_categories(selected, categories, empty_text):
+    """
+    Собирает сообщения по категориям: [(лист, заголовок)], selected — {лист: [Offer, ...]}.
+    """
     messages = []
+    for sheet_name, header in categories:
+        blocks = [format_offer(offer) for offer in selected.get(sheet_name, [])]
+        if blocks:
+            messages += pack_blocks(blocks, header)
+    return messages or [empty_text]
 
-    for block in blocks:
-        if len(combined) + len(block) < 4096:
-            combined += block
-        else:
-            messages.append(combined)
-            combined = block
-    messages.append(combined)
 
-    await asyncio.sleep(1)  # защита от перегрузки Telegram API
-    for i, msg in enumerate(messages):
-        await send_long(bot, chat_id, msg if i == 0 else msg.replace(header, ""))
+# === Акции: Аромки ===
+async def send_aromki_full(bot, chat_id, notice=True):
+    """
+    Получает и отправляет акцию из листа "Акции Аромки".
+    notice=False — без предупреждения об устаревших данных (его отправит вызывающий).
+    """
+    sheet = (await load_offers(["Акции Аромки"]))["Акции Аромки"]
+    messages = cached_render(
+        ("Акции Аромки", "all", None), [sheet],
+        lambda: [format_aromki_message(sheet.rows)]
+    )
+    await send_messages(bot, chat_id, messages, sheet_names=["Акции Аромки"] if notice else ())
 
 
 # === Акции: Снеки ===
-async def send_sneki_full(bot, chat_id):
+async def send_sneki_full(bot, chat_id, notice=True):
     """
-    Получает и отправляет все акции из листа "Акции Снеки"
+    Получает и отправляет все акции из листа "Акции Снеки".
+    notice=False — без предупреждения об устаревших данных (его отправит вызывающий).
     """
     try:
-        rows = get_sheet_data("Акции Снеки")
-        blocks = format_all_blocks(rows, skip_rows=2)
-        await send_combined_blocks(bot, chat_id, blocks, "🧾 Акция: Снеки\n")
+        sheet = (await load_offers(["Акции Снеки"]))["Акции Снеки"]
+        messages = cached_render(
+            ("Акции Снеки", "all", None), [sheet],
+            lambda: pack_blocks([format_offer(offer) for offer in sheet.offers], "🧾 Акция: Снеки\n")
+        )
+        await send_messages(bot, chat_id, messages, sheet_names=["Акции Снеки"] if notice else ())
     except Exception as e:
         await bot.send_message(chat_id=chat_id, text=f"⚠️ Ошибка при загрузке акций Снеки: {e}")
 
 
 # === Акции: Напитки ===
-async def send_drinks_full(bot, chat_id):
+async def send_drinks_full(bot, chat_id, notice=True):
     """
-    Получает и отправляет все акции из листа "Акции Напитки"
+    Получает и отправляет все акции из листа "Акции Напитки".
+    notice=False — без предупреждения об устаревших данных (его отправит вызывающий).
     """
     try:
-        rows = get_sheet_data("Акции Напитки")
-        blocks = format_all_blocks(rows, skip_rows=1)
-        await send_combined_blocks(bot, chat_id, blocks, "🥤 Акция: Напитки\n")
+        sheet = (await load_offers(["Акции Напитки"]))["Акции Напитки"]
+        messages = cached_render(
+            ("Акции Напитки", "all", None), [sheet],
+            lambda: pack_blocks([format_offer(offer) for offer in sheet.offers], "🥤 Акция: Напитки\n")
+        )
+        await send_messages(bot, chat_id, messages, sheet_names=["Акции Напитки"] if notice else ())
     except Exception as e:
         await bot.send_message(chat_id=chat_id, text=f"⚠️ Ошибка при загрузке акций Напитки: {e}")
 
-def parse_end_date(period_str):
-    try:
-        # Извлекаем конец периода
-        _, end_str = period_str.split('-')
-        end_str = end_str.strip()
-        # Поддержка форматов с годом и без
-        for fmt in ("%d.%m.%y", "%d.%m.%Y", "%d.%m"):
-            try:
-                parsed = datetime.strptime(end_str, fmt).date()
-                # Если год не указан — добавим текущий
-                if fmt == "%d.%m":
-                    parsed = parsed.replace(year=datetime.now().year)
-                return parsed
-            except:
-                continue
-        return None
-    except:
-        return None
-# === Функция: Нормализация и сравнение даты начала ===
-def is_starting_today(period_str, today):
-    try:
-        start_str = period_str.split('-')[0].strip()
-        if len(start_str.split('.')) == 3:
-            start_date = datetime.strptime(start_str, '%d.%m.%y')
-        else:
-            start_date = datetime.strptime(start_str, '%d.%m')
-            start_date = start_date.replace(year=today.year)
-        return start_date.date() == today
-    except:
-        return False
-        
-# === Фильтрация новых акций (по сегодняшней дате начала) ===
-def filter_today_blocks(rows, skip_rows=1):
-    today = datetime.now().date()
-    blocks = []
-    current_block = []
-
-    def parse_start_date(row):
-        try:
-            period = row[1] if len(row) > 1 else ""
-            start_str = period.split("-")[0].strip()
-            today = datetime.now().date()
-            for fmt in ("%d.%m", "%d.%m.%y", "%d.%m.%Y"):
-                try:
-                    parsed = datetime.strptime(start_str, fmt).date()
-                    # Если год не указан, ставим текущий
-                    if fmt == "%d.%m":
-                        parsed = parsed.replace(year=today.year)
-                    return parsed
-                except:
-                    continue
-            return None
-        except:
-            return None
-
-    for row in rows[skip_rows:]:
-        if not any(cell.strip() for cell in row):
-            if current_block:
-                main_row = current_block[0]
-                start_date = parse_start_date(main_row)
-                if start_date == today:
-                    blocks.append(current_block)
-                current_block = []
-        else:
-            current_block.append(row)
-
-    if current_block:
-        main_row = current_block[0]
-        start_date = parse_start_date(main_row)
-        if start_date == today:
-            blocks.append(current_block)
-
-    return [format_block(b) for b in blocks]
+
+# === Заголовки категорий для новых и завершённых акций ===
+NEW_CATEGORIES = [
+    ("Акции Аромки", "💧💨 Новые акции: Аромки"),
+    ("Акции Снеки", "🥡 Новые акции: Снеки"),
+    ("Акции Напитки", "🥤 Новые акции: Напитки")
+]
+
+EXPIRED_CATEGORIES = [
+    ("Акции Аромки", "💧💨 Завершённые акции: Аромки"),
+    ("Акции Снеки", "🥡 Завершённые акции: Снеки"),
+    ("Акции Напитки", "🥤 Завершённые акции: Напитки")
+]
+
+
+# === Новые акции на дату по категориям ===
+async def _send_new_by_categories(bot, chat_id, target_date, empty_text):
+    sheets = await load_offers([sheet_name for sheet_name, _ in NEW_CATEGORIES])
+    messages = cached_render(
+        ("categories", "new", target_date, empty_text), sheets.values(),
+        lambda: _render_by_categories(starting_on(sheets.values(), target_date), NEW_CATEGORIES, empty_text)
+    )
+    await send_messages(bot, chat_id, messages, sheet_names=list(sheets))
 
 
 # === Отправка новых акций на сегодня по категориям ===
@@ -141,362 +200,194 @@ async def send_today_offers(bot, chat_id):
     Отправляет новые акции, дата начала которых совпадает с сегодняшним днём.
     Каждая категория отправляется отдельным сообщением с заголовком.
     """
-    categories = [
-        ("Акции Аромки", 2, "💧💨 Новые акции: Аромки"),
-        ("Акции Снеки", 2, "🥡 Новые акции: Снеки"),
-        ("Акции Напитки", 1, "🥤 Новые акции: Напитки")
-    ]
-
-    any_found = False
-
     try:
-        for sheet_name, skip_rows, header in categories:
-            rows = get_sheet_data(sheet_name)
-            filtered_blocks = filter_today_blocks(rows, skip_rows=skip_rows)
-
-            if filtered_blocks:
-                any_found = True
-                await send_combined_blocks(bot, chat_id, filtered_blocks, header)
-
-        if not any_found:
-            await bot.send_message(chat_id=chat_id, text="📜 Новых акций нет на сегодня.")
+        today = get_local_today()
+        await _send_new_by_categories(bot, chat_id, today, "📜 Новых акций нет на сегодня.")
     except Exception as e:
         await bot.send_message(chat_id=chat_id, text=f"⚠️ Ошибка при получении новых акций: {e}")
 
 
 
-# === Фильтрация завершённых акций (вчерашняя дата окончания) ===
-def filter_expired_blocks(rows, reference_date: datetime.date, skip_rows=1):
-    blocks = []
-    current_block = []
-
-    for row in rows[skip_rows:]:
-        if not any(cell.strip() for cell in row):
-            if current_block:
-                main_row = current_block[0]
-                if len(main_row) > 1:
-                    end_date = parse_end_date(main_row[1])
-                    if end_date and end_date == (reference_date - timedelta(days=1)):
-                        blocks.append(current_block)
-                current_block = []
-        else:
-            current_block.append(row)
-
-    if current_block:
-        main_row = current_block[0]
-        if len(main_row) > 1:
-            end_date = parse_end_date(main_row[1])
-            if end_date and end_date == (reference_date - timedelta(days=1)):
-                blocks.append(current_block)
-
-    return [format_block(b) for b in blocks]
+# === Завершённые акции по категориям ===
+async def _send_expired_by_categories(bot, chat_id, reference_date, empty_text):
+    """
+    Отправляет акции, закончившиеся накануне reference_date.
+    """
+    day_before = reference_date - timedelta(days=1)
+    sheets = await load_offers([sheet_name for sheet_name, _ in EXPIRED_CATEGORIES])
+    messages = cached_render(
+        ("categories", "expired", reference_date, empty_text), sheets.values(),
+        lambda: _render_by_categories(ending_on(sheets.values(), day_before), EXPIRED_CATEGORIES, empty_text)
+    )
+    await send_messages(bot, chat_id, messages, sheet_names=list(sheets))
 
 
 # === Отправка завершённых акций (вчера закончились) ===
 # === Вывод завершённых акций (с учётом даты, если передана)
 async def send_expired_offers(bot, chat_id, reference_date=None):
     if reference_date is None:
-        reference_date = datetime.now().date()
-
-    categories = [
-        ("Акции Аромки", 2, "💧💨 Завершённые акции: Аромки"),
-        ("Акции Снеки", 2, "🥡 Завершённые акции: Снеки"),
-        ("Акции Напитки", 1, "🥤 Завершённые акции: Напитки")
-    ]
-
-    any_found = False
-
-    for sheet_name, skip, header in categories:
-        rows = get_sheet_data(sheet_name)
-        filtered = filter_expired_blocks(rows, reference_date, skip_rows=skip)
-        if filtered:
-            any_found = True
-            await send_combined_blocks(bot, chat_id, filtered, header)
-
-    if not any_found:
-        await bot.send_message(chat_id=chat_id, text="✅ На выбранную дату все акции ещё действуют.")
-
-
-
-def filter_blocks_by_start_date(rows, target_date, skip_rows=1):
-    blocks = []
-    current_block = []
-
-    def parse_date(date_str):
-        """
-        Преобразует строку даты в объект datetime.date
-        """
-        for fmt in ("%d.%m", "%d.%m.%y", "%d.%m.%Y"):
-            try:
-                dt = datetime.strptime(date_str, fmt)
-                if fmt == "%d.%m":
-                    dt = dt.replace(year=datetime.now().year)
-                return dt.date()
-            except:
-                continue
-        return None
+        reference_date = get_local_today()
 
-    # Конвертируем введённую пользователем дату
-    target_date_obj = parse_date(target_date)
-    if not target_date_obj:
-        return []
-
-    def parse_start_date(period_str):
-        try:
-            start_str = period_str.split("-")[0].strip()
-            return parse_date(start_str)
-        except:
-            return None
-
-    for row in rows[skip_rows:]:
-        if not any(cell.strip() for cell in row):
-            if current_block:
-                main_row = current_block[0]
-                if len(main_row) > 1:
-                    start_date = parse_start_date(main_row[1])
-                    if start_date == target_date_obj:
-                        blocks.append(current_block)
-                current_block = []
-        else:
-            current_block.append(row)
-
-    # обработка последнего блока
-    if current_block:
-        main_row = current_block[0]
-        if len(main_row) > 1:
-            start_date = parse_start_date(main_row[1])
-            if start_date == target_date_obj:
-                blocks.append(current_block)
-
-    return [format_block(b) for b in blocks]
-
-def filter_blocks_by_end_date(rows, target_date, skip_rows=1):
-    blocks = []
-    current_block = []
+    await _send_expired_by_categories(bot, chat_id, reference_date, "✅ На выбранную дату все акции ещё действуют.")
 
-    try:
-        target_date_obj = datetime.strptime(target_date, "%d.%m").date()
-    except ValueError:
-        return []
-
-    def parse_end_date(period_str):
-        try:
-            _, end_str = period_str.split('-')
-            end_date = datetime.strptime(end_str.strip(), "%d.%m").date()
-            return end_date.replace(year=target_date_obj.year)
-        except:
-            return None
-
-    for row in rows[skip_rows:]:
-        if not any(cell.strip() for cell in row):
-            if current_block:
-                main_row = current_block[0]
-                if len(main_row) > 1:
-                    end_date = parse_end_date(main_row[1])
-                    if end_date == (target_date_obj - timedelta(days=1)):
-                        blocks.append(current_block)
-                current_block = []
-        else:
-            current_block.append(row)
-
-    # Обработка последнего блока
-    if current_block:
-        main_row = current_block[0]
-        if len(main_row) > 1:
-            end_date = parse_end_date(main_row[1])
-            if end_date == (target_date_obj - timedelta(days=1)):
-                blocks.append(current_block)
-
-    return [format_block(b) for b in blocks]
 
 
 async def send_new_offers_by_date(bot, chat_id, target_date):
-    categories = [
-        ("Акции Аромки", 2, "💧💨 Новые акции: Аромки"),
-        ("Акции Снеки", 2, "🥡 Новые акции: Снеки"),
-        ("Акции Напитки", 1, "🥤 Новые акции: Напитки")
-    ]
-    any_found = False
-    for name, skip, header in categories:
-        rows = get_sheet_data(name)
-        filtered = filter_blocks_by_start_date(rows, target_date, skip_rows=skip)
-        if filtered:
-            any_found = True
-            await send_combined_blocks(bot, chat_id, filtered, header)
-
-    if not any_found:
+    target_date_obj = parse_date(target_date)
+    if not target_date_obj:
         await bot.send_message(chat_id=chat_id, text="📭 Новых акций на эту дату нет.")
+        return
+
+    await _send_new_by_categories(bot, chat_id, target_date_obj, "📭 Новых акций на эту дату нет.")
 
 async def send_expired_offers_by_date(bot, chat_id, target_date_str):
     try:
         # Преобразуем строку даты в объект с учётом форматов
-        for fmt in ("%d.%m.%Y", "%d.%m.%y", "%d.%m"):
-            try:
-                reference_date = datetime.strptime(target_date_str, fmt).date()
-                if fmt == "%d.%m":
-                    reference_date = reference_date.replace(year=datetime.now().year)
-                break
-            except:
-                continue
-        else:
+        reference_date = parse_date(target_date_str)
+        if not reference_date:
             await bot.send_message(chat_id=chat_id, text="❌ Неверный формат даты. Введите в формате ДД.ММ")
             return
 
-        categories = [
-            ("Акции Аромки", 2, "💧💨 Завершённые акции: Аромки"),
-            ("Акции Снеки", 2, "🥡 Завершённые акции: Снеки"),
-            ("Акции Напитки", 1, "🥤 Завершённые акции: Напитки")
-        ]
-
-        any_found = False
-
-        for sheet_name, skip, header in categories:
-            rows = get_sheet_data(sheet_name)
-            filtered = filter_expired_blocks(rows, reference_date, skip_rows=skip)
-            if filtered:
-                any_found = True
-                await send_combined_blocks(bot, chat_id, filtered, header)
-
-        if not any_found:
-            await bot.send_message(chat_id=chat_id, text="✅ На выбранную дату завершённых акций нет.")
+        await _send_expired_by_categories(bot, chat_id, reference_date, "✅ На выбранную дату завершённых акций нет.")
 
     except Exception as e:
         await bot.send_message(chat_id=chat_id, text=f"⚠️ Ошибка при обработке запроса: {e}")
 
 
 def get_local_today():
-    return datetime.utcnow().date() + timedelta(hours=3) 
+    """
+    «Сегодня» в часовом поясе бота (DIGEST_TIMEZONE, по умолчанию — как на сервере).
+    Одна дата для кнопок и ежедневной сводки: у них общие ключи кэша готовых сообщений.
+    """
+    return datetime.now(DIGEST_TZ).date()
 
-def parse_date_range_simple(period: str):
-    try:
-        start_str, end_str = period.split("-")
-        start = datetime.strptime(start_str.strip(), "%d.%m").date()
-        end = datetime.strptime(end_str.strip(), "%d.%m").date()
-        current_year = datetime.now().year
-        return start.replace(year=current_year), end.replace(year=current_year)
-    except:
-        try:
-            start = datetime.strptime(start_str.strip(), "%d.%m.%y").date()
-            end = datetime.strptime(end_str.strip(), "%d.%m.%y").date()
-            return start, end
-        except:
-            return None, None
 
-async def send_formatted_new_offers(bot, chat_id, context):
-    from datetime import datetime
+# === Строка акции для пересылки: «🍀 период товар скидка» ===
+def _offer_lines(offer):
+    period = offer.period.replace(' ', '').replace('-', '–')
+    return [f"🍀 {period} {product} {offer.discount}".strip() for product in offer.products]
+
 
-    chosen_date_str = context.user_data.get("chosen_date")
-    target_date = datetime.strptime(chosen_date_str, "%d.%m.%Y").date() if chosen_date_str else datetime.now().date()
+FORMATTED_CATEGORIES = ["Акции Напитки", "Акции Снеки", "Акции Аромки"]
 
-    categories = ["Акции Напитки", "Акции Снеки", "Акции Аромки"]
+
+def render_formatted_new_offers(sheets, target_date):
+    """
+    Тексты «🟢 НОВЫЕ АКЦИИ 🟢» для пересылки: акции, исключения и адреса исключений.
+    """
     offers = []
     exceptions = []
     exception_addresses = []
 
-    for category in categories:
-        rows = get_sheet_data(category)
-        for row in rows:
-            try:
-                if len(row) < 4:
-                    continue
-
-                period = row[1].strip()
-                start, end = parse_date_range_simple(period)
-                if start != target_date:
-                    continue
-
-                products = row[2].splitlines() if len(row) > 2 else []
-                discount = row[3].strip()
-
-                for product in products:
-                    clean_product = ' '.join(product.strip().split())
-                    if clean_product:
-                        offer_line = f"🍀 {period.replace(' ', '').replace('-', '–')} {clean_product} {discount}"
-                        offers.append(offer_line)
-
-                # Обработка исключений — только в категории "Акции Напитки"
-                if category == "Акции Напитки" and len(row) > 5 and row[5].strip().lower() not in ["", "немає", "нет"]:
-                    for product in products:
-                        clean_product = ' '.join(product.strip().split())
-                        if clean_product:
-                            exc_line = f"🍀 {period.replace(' ', '').replace('-', '–')} {clean_product} {discount}"
-                            exceptions.append(exc_line)
-
-                    # Добавляем адреса, если они есть (в колонке F)
-                    exception_addresses += [addr.strip() for addr in row[5].splitlines() if addr.strip()]
-
-            except Exception as e:
-                print(f"Ошибка при обработке строки: {e}")
+    selected = starting_on((sheets[category] for category in FORMATTED_CATEGORIES), target_date)
+    for category in FORMATTED_CATEGORIES:
+        for offer in selected[category]:
+            # Строки без колонки скидки не отправляем
+            if offer.discount is None:
                 continue
 
-    if offers:
-        await bot.send_message(chat_id, "🟢 НОВЫЕ АКЦИИ 🟢\n" + "\n".join(offers))
+            lines = _offer_lines(offer)
+            offers += lines
+
+            # Обработка исключений — только в категории "Акции Напитки"
+            if category == "Акции Напитки" and offer.has_exceptions:
+                exceptions += lines
+
+                # Добавляем адреса, если они есть (в колонке F)
+                exception_addresses += [addr.strip() for addr in offer.exceptions.splitlines() if addr.strip()]
+
+    if not offers:
+        return [f"📭 Новых акций на {target_date.strftime('%d.%m.%Y')} нет для отправки."]
 
-        if exceptions:
-            await bot.send_message(chat_id, "‼️ Есть исключение для акции:\n" + "\n".join(exceptions))
-            if exception_addresses:
-                await bot.send_message(chat_id, "\n".join(exception_addresses))
-        else:
-            await bot.send_message(chat_id, "✅ Для текущих акций исключений нет.")
+    messages = ["🟢 НОВЫЕ АКЦИИ 🟢\n" + "\n".join(offers)]
+    if exceptions:
+        messages.append("‼️ Есть исключение для акции:\n" + "\n".join(exceptions))
+        if exception_addresses:
+            messages.append("\n".join(exception_addresses))
     else:
-        await bot.send_message(chat_id, f"📭 Новых акций на {target_date.strftime('%d.%m.%Y')} нет для отправки.")
+        messages.append("✅ Для текущих акций исключений нет.")
+    return messages
+
+
+async def send_formatted_new_offers(bot, chat_id, chosen_date_str=None):
+    # chosen_date_str — дата ДД.ММ.ГГГГ, прочитанная из user_data в обработчике
+    target_date = datetime.strptime(chosen_date_str, "%d.%m.%Y").date() if chosen_date_str else get_local_today()
+
+    sheets = await load_offers(FORMATTED_CATEGORIES)
+    messages = cached_render(
+        ("formatted", "new", target_date), sheets.values(),
+        lambda: render_formatted_new_offers(sheets, target_date)
+    )
+    await send_messages(bot, chat_id, messages, parse_mode=None, sheet_names=FORMATTED_CATEGORIES)
+
+
+def render_formatted_expired_offers(sheets, target_date, custom_date_mode=False):
+    """
+    Текст «🔴ЗАКОНЧИЛАСЬ АКЦИЯ🔴» для пересылки: акции, закончившиеся в target_date.
+    """
+    expired_offers = []
+    selected = ending_on((sheets[category] for category in FORMATTED_CATEGORIES), target_date)
+    for category in FORMATTED_CATEGORIES:
+        for offer in selected[category]:
+            if offer.discount is None:
+                continue
+            expired_offers += _offer_lines(offer)
 
+    if expired_offers:
+        return [f"🔴ЗАКОНЧИЛАСЬ АКЦИЯ🔴\n" + "\n".join(expired_offers)]
 
+    if custom_date_mode:
+        original_date = (target_date + timedelta(days=1)).strftime('%d.%m.%Y')
+        return [f"📭 Перед {original_date} не было завершённых акций"]
+    return ["📭 Вчера не было завершённых акций"]
 
 
-async def send_formatted_expired_offers(bot, chat_id, context=None):
+async def send_formatted_expired_offers(bot, chat_id, chosen_date_str=None):
     # Определяем целевую дату
-    if context and context.user_data.get("chosen_date"):
+    if chosen_date_str:
         try:
             # Берем введенную дату и вычитаем 1 день
-            target_date = datetime.strptime(context.user_data["chosen_date"], "%d.%m.%Y").date() - timedelta(days=1)
+            target_date = datetime.strptime(chosen_date_str, "%d.%m.%Y").date() - timedelta(days=1)
             custom_date_mode = True
         except ValueError:
-            target_date = datetime.now().date() - timedelta(days=1)
+            target_date = get_local_today() - timedelta(days=1)
             custom_date_mode = False
     else:
-        target_date = datetime.now().date() - timedelta(days=1)
+        target_date = get_local_today() - timedelta(days=1)
         custom_date_mode = False
-    
-    categories = ["Акции Напитки", "Акции Снеки", "Акции Аромки"]
-    expired_offers = []
-    
-    for category in categories:
-        rows = get_sheet_data(category)
-        for row in rows:
-            try:
-                if len(row) < 4:
-                    continue
-                    
-                period = row[1].strip() if len(row) > 1 else ""
-                if not period:
-                    continue
-                    
-                start_date, end_date = parse_date_range_simple(period)
-                
-                # Ищем акции, которые закончились в target_date (введенная дата -1 день)
-                if end_date == target_date:
-                    products = row[2].splitlines() if len(row) > 2 else []
-                    discount = row[3].strip() if len(row) > 3 else ""
-                    
-                    for product in products:
-                        clean_product = ' '.join(product.strip().split())
-                        if clean_product:
-                            formatted_period = period.replace(' ', '').replace('-', '–')
-                            offer_line = f"🍀 {formatted_period} {clean_product} {discount}".strip()
-                            expired_offers.append(offer_line)
-            
-            except Exception as e:
-                print(f"Ошибка при обработке строки: {e}")
-                continue
 
-    if expired_offers:
-        original_date = (target_date + timedelta(days=1)).strftime('%d.%m.%Y') if custom_date_mode else ""
-        message = f"🔴ЗАКОНЧИЛАСЬ АКЦИЯ🔴\n" + "\n".join(expired_offers)
-        await bot.send_message(chat_id, message)
-    else:
-        original_date = (target_date + timedelta(days=1)).strftime('%d.%m.%Y') if custom_date_mode else ""
-        if custom_date_mode:
-            await bot.send_message(chat_id, f"📭 Перед {original_date} не было завершённых акций")
-        else:
-            await bot.send_message(chat_id, "📭 Вчера не было завершённых акций")
+    # Ищем акции, которые закончились в target_date (введенная дата -1 день)
+    sheets = await load_offers(FORMATTED_CATEGORIES)
+    messages = cached_render(
+        ("formatted", "expired", target_date, custom_date_mode), sheets.values(),
+        lambda: render_formatted_expired_offers(sheets, target_date, custom_date_mode)
+    )
+    await send_messages(bot, chat_id, messages, parse_mode=None, sheet_names=FORMATTED_CATEGORIES)
+
+
+# === Ежедневная сводка для подписчиков ===
+async def build_daily_digest(today=None):
+    """
+    Собирает сводку один раз на всю рассылку: новые акции на сегодня
+    и акции, закончившиеся вчера (те же тексты, что у кнопок «для отправки»).
+    Листы загружаются из Google заново: рассылка не должна уйти по устаревшему кэшу.
+    """
+    today = today or get_local_today()
+    yesterday = today - timedelta(days=1)
+
+    sheets = await load_offers(FORMATTED_CATEGORIES, fresh=True)
+    # Ключи совпадают с кнопками — их нажатия после рассылки тоже берутся из кэша
+    new_messages = cached_render(
+        ("formatted", "new", today), sheets.values(),
+        lambda: render_formatted_new_offers(sheets, today)
+    )
+    expired_messages = cached_render(
+        ("formatted", "expired", yesterday, False), sheets.values(),
+        lambda: render_formatted_expired_offers(sheets, yesterday, False)
+    )
+
+    messages = new_messages + expired_messages
+    notice = stale_notice(FORMATTED_CATEGORIES)
+    if notice:
+        messages.append(notice)
+    return messages
@@ -0,0 +1,311 @@
+from itertools import count
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime, date
+from collections import defaultdict
+from utils import metrics
+
+
+# === Настройки чтения листа ===
+@dataclass(frozen=True, slots=True)
+class SheetConfig:
+    """
+    header_rows — служебные строки сверху листа;
+    columns — какие колонки читать (логика использует только A–F);
+    first_row — с какой строки читать (окно без старых акций). Должна быть
+    началом блока акции; None — весь лист.
+    """
+    header_rows: int = 1
+    columns: str = "A:F"
+    first_row: int | None = None
+
+    @property
+    def range(self):
+        """
+        Диапазон A1 без имени листа: "A:F" или "A500:F".
+        """
+        if not self.first_row:
+            return self.columns
+        start, end = self.columns.split(":")
+        return f"{start}{self.first_row}:{end}"
+
+    @property
+    def skip_rows(self):
+        """
+        Сколько строк пропустить в прочитанных данных (заголовки могут не попасть в окно).
+        """
+        if not self.first_row:
+            return self.header_rows
+        return max(self.header_rows - self.first_row + 1, 0)
+
+
+# === Листы с акциями: название -> настройки чтения ===
+# Аромки выводятся по фиксированным строкам 3–4, поэтому читаются без окна
+SHEETS = {
+    "Акции Аромки": SheetConfig(header_rows=2),
+    "Акции Снеки": SheetConfig(header_rows=2),
+    "Акции Напитки": SheetConfig(header_rows=1),
+}
+
+
+def skip_rows_for(category):
+    """
+    Количество служебных строк для листа (1 для неизвестных листов).
+    """
+    config = SHEETS.get(category)
+    return config.skip_rows if config else 1
+
+# Счётчик версий разобранных листов (меняется при каждом новом разборе)
+_versions = count(1)
+
+# Значения колонки исключений, которые означают «исключений нет»
+NO_EXCEPTIONS = ("", "немає", "нет")
+
+
+# === Разбор дат ===
+def parse_date(date_str, year=None):
+    """
+    Преобразует строку ДД.ММ, ДД.ММ.ГГ или ДД.ММ.ГГГГ в datetime.date.
+    Если год не указан — подставляется переданный или текущий.
+    """
+    date_str = date_str.strip()
+    for fmt in ("%d.%m.%y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+
+    # Без года: добавляем год до разбора, чтобы 29.02 корректно разбиралось
+    try:
+        return datetime.strptime(f"{date_str}.{year or datetime.now().year}", "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+def parse_period(period, year=None):
+    """
+    Разбирает период проведения вида «ДД.ММ - ДД.ММ» в пару дат (начало, конец).
+    Нераспознанные части возвращаются как None.
+    """
+    start_str, sep, end_str = period.replace("–", "-").partition("-")
+    start = parse_date(start_str, year) if start_str.strip() else None
+    end = parse_date(end_str, year) if sep and "-" not in end_str else None
+    return start, end
+
+
+# === Модель акции ===
+@dataclass(slots=True)
+class Offer:
+    category: str                 # Лист, из которого взята акция
+    added: str                    # Дата внесения акции (колонка A)
+    period: str                   # Период проведения как в таблице (колонка B)
+    start: date | None            # Начало периода
+    end: date | None              # Конец периода
+    products_text: str            # Товары из основной строки (колонка C)
+    extra_products: tuple         # Товары из дополнительных строк блока
+    discount: str | None          # Механика/% скидки (колонка D), None — колонки нет
+    participants: str             # Участники (колонка E)
+    exceptions: str               # Исключения (колонка F)
+
+    @property
+    def products(self):
+        """
+        Товары основной строки по одному, без лишних пробелов.
+        """
+        lines = (" ".join(line.split()) for line in self.products_text.splitlines())
+        return [line for line in lines if line]
+
+    @property
+    def has_exceptions(self):
+        return self.exceptions.lower() not in NO_EXCEPTIONS
+
+
+def _cell(row, index):
+    return row[index].strip() if len(row) > index else ""
+
+
+def _make_offer(block, category, year):
+    main_row = block[0]
+    period = _cell(main_row, 1)
+    start, end = parse_period(period, year)
+
+    return Offer(
+        category=category,
+        added=_cell(main_row, 0),
+        period=period,
+        start=start,
+        end=end,
+        products_text=_cell(main_row, 2),
+        extra_products=tuple(_cell(row, 2) for row in block[1:] if _cell(row, 2)),
+        discount=_cell(main_row, 3) if len(main_row) > 3 else None,
+        participants=_cell(main_row, 4),
+        exceptions=_cell(main_row, 5),
+    )
+
+
+# === Разбор листа в список акций ===
+def parse_offers(rows, category="", skip_rows=1, year=None):
+    """
+    Делит строки листа на блоки (пустая строка — разделитель)
+    и превращает каждый блок в Offer.
+    """
+    year = year or datetime.now().year
+    offers = []
+    current_block = []
+
+    # Пропускаем служебные строки (заголовки)
+    for row in rows[skip_rows:]:
+        if not any(cell.strip() for cell in row):
+            if current_block:
+                offers.append(_make_offer(current_block, category, year))
+                current_block = []
+        else:
+            current_block.append(row)
+
+    # Последний блок, если лист не закончился пустой строкой
+    if current_block:
+        offers.append(_make_offer(current_block, category, year))
+
+    return offers
+
+
+# === Акции листа с индексами по датам ===
+class SheetOffers:
+    """
+    Разобранный лист: исходные строки, список акций и индексы по дате начала и окончания.
+    version меняется при каждом новом разборе и служит ключом для кэшей поверх листа.
+    """
+    __slots__ = ("category", "version", "year", "rows", "offers", "by_start", "by_end")
+
+    def __init__(self, category, offers, year=None, rows=None):
+        self.category = category
+        self.version = next(_versions)
+        self.rows = rows if rows is not None else []
+        self.year = year or datetime.now().year
+        self.offers = offers
+        self.by_start = defaultdict(list)
+        self.by_end = defaultdict(list)
+
+        for offer in offers:
+            if offer.start:
+                self.by_start[offer.start].append(offer)
+            if offer.end:
+                self.by_end[offer.end].append(offer)
+
+    def starting_on(self, day):
+        return self.by_start.get(day, [])
+
+    def ending_on(self, day):
+        return self.by_end.get(day, [])
+
+
+# === Кэш разобранных листов: название -> SheetOffers ===
+_parsed = {}
+
+
+def index_sheet(category, rows, skip_rows=None):
+    """
+    Возвращает разобранный лист. Повторный разбор выполняется
+    только если кэш листов вернул новые данные (или сменился год).
+    """
+    year = datetime.now().year
+    cached = _parsed.get(category)
+    if cached and cached.rows is rows and cached.year == year:
+        return cached
+
+    if skip_rows is None:
+        skip_rows = skip_rows_for(category)
+
+    with metrics.timer("parse_seconds", sheet=category):
+        sheet = SheetOffers(category, parse_offers(rows, category, skip_rows, year), year, rows)
+    _parsed[category] = sheet
+    return sheet
+
+
+# === Акции нескольких листов на день (по словарным индексам) ===
+def starting_on(sheets, day):
+    """
+    {категория: [Offer, ...]} — акции листов, которые начинаются в day.
+    """
+    return {sheet.category: sheet.starting_on(day) for sheet in sheets}
+
+
+def ending_on(sheets, day):
+    """
+    {категория: [Offer, ...]} — акции листов, которые заканчиваются в day.
+    """
+    return {sheet.category: sheet.ending_on(day) for sheet in sheets}
+
+
+# === Колоночная таблица акций всех категорий ===
+# Точный день начала/окончания ищется по словарям SheetOffers за O(1). Запросы по диапазону
+# («действует в день D», «пересекается с периодом») словарём не ответить, поэтому для них
+# даты хранятся порядковыми номерами дней (date.toordinal) в массивах NumPy и
+# проверяются одной векторной маской по всем категориям сразу.
+_NO_START = np.iinfo(np.int32).max   # Нет даты начала: не попадает ни в один период
+_NO_END = -1                         # Нет даты окончания
+
+
+class OfferTable:
+    """
+    Акции нескольких листов в колоночном виде:
+    offers — общая таблица акций (листы подряд), offsets — номер первой строки каждого листа
+    в этой таблице, start/end — массивы дат по строкам таблицы.
+    Запросы возвращают {категория: [Offer, ...]} в порядке листов.
+    """
+    __slots__ = ("categories", "offers", "offsets", "start", "end")
+
+    def __init__(self, sheets):
+        sheets = list(sheets)
+        self.categories = [sheet.category for sheet in sheets]
+        self.offers = [offer for sheet in sheets for offer in sheet.offers]
+        self.offsets = np.cumsum([0] + [len(sheet.offers) for sheet in sheets])
+
+        size = len(self.offers)
+        self.start = np.fromiter(
+            (offer.start.toordinal() if offer.start else _NO_START for offer in self.offers), dtype=np.int32, count=size
+        )
+        self.end = np.fromiter(
+            (offer.end.toordinal() if offer.end else _NO_END for offer in self.offers), dtype=np.int32, count=size
+        )
+
+    def _select(self, mask):
+        # Строки листов идут подряд: границы листов делят выбранные номера на части
+        indices = np.flatnonzero(mask)
+        parts = np.split(indices, np.searchsorted(indices, self.offsets[1:-1]))
+        return {
+            category: [self.offers[index] for index in part.tolist()]
+            for category, part in zip(self.categories, parts)
+        }
+
+    def active_on(self, day):
+        """
+        Акции, которые действуют в day (начались не позже и закончатся не раньше).
+        """
+        ordinal = day.toordinal()
+        return self._select((self.start <= ordinal) & (self.end >= ordinal))
+
+    def overlapping(self, first_day, last_day):
+        """
+        Акции, период которых пересекается с [first_day, last_day].
+        """
+        return self._select((self.start <= last_day.toordinal()) & (self.end >= first_day.toordinal()))
+
+
+# === Кэш таблиц: версии листов -> OfferTable ===
+TABLE_CACHE_SIZE = 8
+_tables = {}
+
+
+def offer_table(sheets):
+    """
+    Возвращает OfferTable для листов. Таблица строится один раз на набор версий листов.
+    """
+    sheets = list(sheets)
+    key = tuple(sheet.version for sheet in sheets)
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = OfferTable(sheets)
+        while len(_tables) > TABLE_CACHE_SIZE:
+            del _tables[next(iter(_tables))]
+    return table
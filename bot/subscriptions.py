@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.error import Forbidden, TelegramError
+
+from bot.handlers import is_blocked
+from bot.logic import build_daily_digest, send_messages
+from utils.subscribers import add_subscriber, remove_subscriber, get_subscribers
+
+
+# === Команда /subscribe — подписка на ежедневную сводку ===
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        if is_blocked(update.effective_user.id):
+            await update.message.reply_text("⛔️ У вас нет доступа к этому боту.")
+            return
+
+        if add_subscriber(update.effective_chat.id):
+            await update.message.reply_text("🔔 Вы подписались на ежедневную сводку новых и завершённых акций.")
+        else:
+            await update.message.reply_text("🔔 Вы уже подписаны на ежедневную сводку.")
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ Ошибка при подписке: {e}")
+
+
+# === Команда /unsubscribe — отписка от сводки ===
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        if remove_subscriber(update.effective_chat.id):
+            await update.message.reply_text("🔕 Вы отписались от ежедневной сводки.")
+        else:
+            await update.message.reply_text("🔕 Вы не были подписаны на сводку.")
+    except Exception as e:
+        await update.message.reply_text(f"⚠️ Ошибка при отписке: {e}")
+
+
+async def _deliver(bot, chat_id, messages):
+    try:
+        await send_messages(bot, chat_id, messages, parse_mode=None)
+    except Forbidden:
+        # Пользователь заблокировал бота — больше не пишем ему
+        remove_subscriber(chat_id)
+    except TelegramError as e:
+        logging.error(f"Ошибка при отправке сводки в чат {chat_id}: {e}")
+
+
+# === Ежедневная рассылка (JobQueue) ===
+async def daily_digest_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Сводка считается один раз и рассылается всем подписчикам, кроме заблокированных
+    (их подписка сохраняется на случай разблокировки); темп отправки держит
+    TelegramRateLimiter приложения.
+    """
+    subscribers = [chat_id for chat_id in get_subscribers() if not is_blocked(chat_id)]
+    if not subscribers:
+        return
+
+    try:
+        # «Сегодня» — как у кнопок (get_local_today), чтобы ключи кэша сообщений совпадали
+        messages = await build_daily_digest()
+    except Exception as e:
+        logging.error(f"Ошибка при подготовке ежедневной сводки: {e}")
+        return
+
+    await asyncio.gather(*(_deliver(context.bot, chat_id, messages) for chat_id in subscribers))
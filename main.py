@@ -5,13 +5,38 @@ from telegram.error import TelegramError
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
 
 
-from bot.config import BOT_TOKEN
+from bot.config import (
+    BOT_TOKEN,
+    CONCURRENT_UPDATES,
+    BOT_MODE,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET,
+    DIGEST_TIME,
+    DIGEST_TZ,
+)
+from utils.google_sheets import get_google_service, set_sheet_ranges, warm_up
+from utils.rate_limiter import TelegramRateLimiter
+from utils.concurrency import PerChatUpdateProcessor
+from utils.webhook_server import serve_webhook
+from utils.user_registry import load_registry
+from utils.subscribers import load_subscribers
+from utils.stats import stats_flush_loop, flush_stats
+from utils.logger import activity_flush_loop, stop_activity_logging
+from utils.metrics import start_metrics_server
+from bot.offers import SHEETS
 from bot.handlers import start, handle_message, handle_date_input
+from bot.subscriptions import subscribe_command, unsubscribe_command, daily_digest_job
 from bot.admin_commands import (
     stats_command,
     last_users_command,
     log_command,
     version_command,
+    refresh_command,
+    metrics_command,
+    profile_command,
 )
 
 
@@ -28,11 +53,58 @@ logging.basicConfig(
 )
 
 
+# === Фоновые задачи: запуск при старте и остановка при завершении ===
+async def on_startup(application):
+    application.bot_data["background_tasks"] = [
+        asyncio.create_task(stats_flush_loop()),      # Периодическое сохранение статистики
+        asyncio.create_task(activity_flush_loop()),   # Периодический сброс журнала активности
+    ]
+
+    # Endpoint метрик для Prometheus (если задан METRICS_PORT)
+    application.bot_data["metrics_server"] = await start_metrics_server()
+
+
+async def on_shutdown(application):
+    for task in application.bot_data.get("background_tasks", []):
+        task.cancel()
+
+    metrics_server = application.bot_data.get("metrics_server")
+    if metrics_server:
+        metrics_server.close()
+
+    # Сохраняем всё, что накопилось в памяти
+    flush_stats()
+    stop_activity_logging()
+
+
 # === Основная функция запуска бота ===
 async def main():
     try:
+        # Создаём общий клиент Google Sheets заранее, а не при первом запросе
+        get_google_service()
+
+        # Читаем только нужные колонки и строки листов
+        set_sheet_ranges({name: config.range for name, config in SHEETS.items()})
+
+        # Снимок листов с диска — сразу, свежие данные из Google — в фоне
+        warm_up(list(SHEETS))
+
+        # Загружаем список известных пользователей в память один раз
+        load_registry()
+        load_subscribers()
+
         # Создаём приложение Telegram-бота
-        app = ApplicationBuilder().token(BOT_TOKEN).build()
+        # Ограничитель запросов притормаживает отправку только у лимитов Telegram
+        app = (
+            ApplicationBuilder()
+            .token(BOT_TOKEN)
+            .rate_limiter(TelegramRateLimiter())
+            # Разные пользователи обслуживаются параллельно, апдейты одного чата — по очереди
+            .concurrent_updates(PerChatUpdateProcessor(CONCURRENT_UPDATES))
+            .post_init(on_startup)
+            .post_shutdown(on_shutdown)
+            .build()
+        )
 
         # Обработчик команды /start
         app.add_handler(CommandHandler("start", start))
@@ -52,14 +124,45 @@ async def main():
 
         # Обработчик команды /version — отображает текущую версию бота
         app.add_handler(CommandHandler("version", version_command))
+
+        # Обработчик команды /refresh — сбрасывает кэш листов Google Таблицы
+        app.add_handler(CommandHandler("refresh", refresh_command))
         
+        # Обработчик команды /metrics — задержки обработчиков, Google и Telegram, попадания в кэш
+        app.add_handler(CommandHandler("metrics", metrics_command))
+
+        # Обработчик команды /profile — профилирование следующих N апдейтов (cProfile)
+        app.add_handler(CommandHandler("profile", profile_command))
+
+        # Обработчики команд /subscribe и /unsubscribe — подписка на ежедневную сводку
+        app.add_handler(CommandHandler("subscribe", subscribe_command))
+        app.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+
+        # Ежедневная сводка подписчикам (нужен python-telegram-bot[job-queue])
+        if app.job_queue:
+            app.job_queue.run_daily(daily_digest_job, time=DIGEST_TIME.replace(tzinfo=DIGEST_TZ), name="daily_digest")
+        else:
+            print("⚠️ JobQueue недоступен: установите python-telegram-bot[job-queue], рассылка отключена")
+
         # Обработка ввода даты — если это ДД.ММ формат
         app.add_handler(MessageHandler(filters.Regex(r"^\d{2}\.\d{2}$"), handle_date_input))
 
         print("🤖 Бот запущен. Ожидает /start и выбор кнопки")
 
-        # Запуск polling
-        await app.run_polling()
+        if BOT_MODE == "webhook":
+            # Запуск webhook-сервера. Только один процесс: рассылка, статистика, подписчики,
+            # реестр пользователей и лимит запросов к Telegram живут в памяти процесса
+            await serve_webhook(
+                app,
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                webhook_url=WEBHOOK_URL or None,
+            )
+        else:
+            # Запуск polling
+            await app.run_polling()
 
     except TelegramError as e:
         logging.error(f"Ошибка Telegram API: {e}", exc_info=True)
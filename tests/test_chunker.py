@@ -0,0 +1,108 @@
+import re
+
+import pytest
+
+from utils.chunker import utf16_len, pack_blocks, split_text
+
+TAG = re.compile(r"<(/?)([a-z-]+)[^<>]*>")
+
+
+def assert_valid(parts, limit):
+    """
+    Каждая часть не длиннее limit, теги в ней сбалансированы, сущности не разрезаны.
+    """
+    for part in parts:
+        assert utf16_len(part) <= limit
+        stack = []
+        for closing, name in TAG.findall(part):
+            if closing:
+                assert stack and stack.pop() == name, part
+            else:
+                stack.append(name)
+        assert not stack, part
+        assert not re.search(r"&\w*$", part), part
+        assert not re.search(r"<[^>]*$", part), part
+
+
+def strip_tags(text):
+    return TAG.sub("", text)
+
+
+def test_short_text_is_not_split():
+    assert split_text("<b>коротко</b>", 40) == ["<b>коротко</b>"]
+
+
+def test_element_is_not_cut_in_the_middle():
+    text = "x" * 35 + "<b>bold</b> tail"
+    parts = split_text(text, 40)
+
+    assert_valid(parts, 40)
+    assert "".join(parts) == text
+
+
+def test_long_element_is_closed_and_reopened():
+    text = "<b>" + "word " * 30 + "</b>"
+    parts = split_text(text, 40)
+
+    assert len(parts) > 1
+    assert_valid(parts, 40)
+    assert all(part.startswith("<b>") and part.endswith("</b>") for part in parts)
+    assert "".join(strip_tags(part) for part in parts) == strip_tags(text)
+
+
+def test_nested_elements_keep_attributes():
+    text = 'начало <a href="https://example.com"><i>' + "ссылка " * 20 + "</i></a> конец"
+    parts = split_text(text, 50)
+
+    assert_valid(parts, 50)
+    assert all(part.startswith('<a href="https://example.com"><i>') for part in parts[1:-1])
+    assert "".join(strip_tags(part) for part in parts) == strip_tags(text)
+
+
+def test_entities_are_not_cut():
+    text = "a &amp; b &lt;c&gt; " * 20
+    parts = split_text(text, 30)
+
+    assert_valid(parts, 30)
+    assert "".join(parts) == text
+
+
+def test_prefers_line_boundaries():
+    text = "строка номер раз\n" * 10
+    parts = split_text(text, 40)
+
+    assert all(part.endswith("\n") for part in parts)
+    assert "".join(parts) == text
+
+
+def test_long_word_is_cut_between_characters():
+    text = "y" * 100
+    parts = split_text(text, 40)
+
+    assert [len(part) for part in parts] == [40, 40, 20]
+
+
+@pytest.mark.parametrize("limit", [10, 11, 41])
+def test_length_is_counted_in_utf16(limit):
+    text = "🥤" * 30
+    parts = split_text(text, limit)
+
+    assert_valid(parts, limit)
+    assert "".join(parts) == text
+
+
+def test_header_is_attached_to_oversized_first_block():
+    messages = pack_blocks(["y" * 50], header="HEAD\n", limit=40)
+
+    assert messages[0].startswith("HEAD\ny")
+    assert_valid(messages, 40)
+    assert "".join(messages) == "HEAD\n" + "y" * 50
+
+
+def test_pack_blocks_keeps_blocks_whole():
+    blocks = [f"<b>Акция {index}</b>\n\n" for index in range(10)]
+    messages = pack_blocks(blocks, header="Заголовок\n", limit=60)
+
+    assert_valid(messages, 60)
+    assert "".join(messages) == "Заголовок\n" + "".join(blocks)
+    assert all(message.endswith("\n\n") for message in messages)
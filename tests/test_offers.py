@@ -0,0 +1,146 @@
+from datetime import date
+
+from bot.messages import format_offer
+from bot.offers import OfferTable, SheetOffers, ending_on, parse_offers, parse_period, starting_on
+
+YEAR = 2025
+
+# Лист «как в таблице»: заголовок, блоки акций через пустую строку
+ROWS = [
+    ["Дата внесения", "Период", "Товары", "Механика", "Участники", "Исключения"],
+    ["25.06", "01.07 - 10.07", "Чипсы Lay's\nCola 0.5л", "-20%", "Все магазины", "нет"],
+    ["", "", "Fanta 1л"],
+    [],
+    ["26.06", "01.07.25 - 05.07.25", "Арахис 200г", "1+1", "Киев"],
+    ["", "   "],
+    ["27.06", "03.07 – 10.07", "Вода"],
+    [],
+    ["28.06", "уточняется", "Сок", "-10%", "Львов"],
+    [],
+    ["29.06", "02.07 - ???", "Энергетик", "-15%", "Только ТЦ", ""],
+]
+
+
+def sheet():
+    return SheetOffers("Акции Снеки", parse_offers(ROWS, "Акции Снеки", skip_rows=1, year=YEAR), YEAR, ROWS)
+
+
+def test_blocks_are_split_by_empty_rows():
+    offers = parse_offers(ROWS, "Акции Снеки", skip_rows=1, year=YEAR)
+
+    assert [offer.added for offer in offers] == ["25.06", "26.06", "27.06", "28.06", "29.06"]
+    assert offers[0].extra_products == ("Fanta 1л",)
+    assert offers[0].products == ["Чипсы Lay's", "Cola 0.5л"]
+    assert all(offer.category == "Акции Снеки" for offer in offers)
+
+
+def test_last_block_without_trailing_empty_row():
+    offers = parse_offers(ROWS[:1] + ROWS[-1:], skip_rows=1, year=YEAR)
+
+    assert len(offers) == 1
+    assert offers[0].products_text == "Энергетик"
+
+
+def test_period_formats():
+    assert parse_period("01.07 - 10.07", YEAR) == (date(2025, 7, 1), date(2025, 7, 10))
+    assert parse_period("01.07.25 - 05.07.25", YEAR) == (date(2025, 7, 1), date(2025, 7, 5))
+    assert parse_period("30.12.2025 - 02.01.2026", YEAR) == (date(2025, 12, 30), date(2026, 1, 2))
+    assert parse_period("03.07 – 10.07", YEAR) == (date(2025, 7, 3), date(2025, 7, 10))
+    assert parse_period("уточняется", YEAR) == (None, None)
+    assert parse_period("02.07 - ???", YEAR) == (date(2025, 7, 2), None)
+
+
+def test_missing_column_d():
+    offers = parse_offers(ROWS, skip_rows=1, year=YEAR)
+
+    assert offers[2].discount is None
+    assert offers[2].participants == ""
+    assert "⚙️ МЕХАНИКА/% скидки: не указано\n" in format_offer(offers[2])
+
+
+def test_index_lookups():
+    offers = sheet()
+
+    assert [offer.added for offer in offers.starting_on(date(2025, 7, 1))] == ["25.06", "26.06"]
+    assert [offer.added for offer in offers.starting_on(date(2025, 7, 3))] == ["27.06"]
+    assert [offer.added for offer in offers.starting_on(date(2025, 7, 2))] == ["29.06"]
+    assert [offer.added for offer in offers.ending_on(date(2025, 7, 10))] == ["25.06", "27.06"]
+    assert [offer.added for offer in offers.ending_on(date(2025, 7, 5))] == ["26.06"]
+    assert offers.starting_on(date(2025, 7, 4)) == []
+    assert offers.ending_on(date(2025, 7, 2)) == []
+
+
+def test_unparsable_period_is_not_indexed():
+    offers = sheet()
+    indexed = {id(offer) for day in offers.by_start.values() for offer in day}
+
+    assert [offer.added for offer in offers.offers if id(offer) not in indexed] == ["28.06"]
+
+
+def test_formatted_text_matches_sheet():
+    # Тот же текст, что давал прежний format_block по строкам блока
+    offer = parse_offers(ROWS, skip_rows=1, year=YEAR)[0]
+
+    assert format_offer(offer) == (
+        "————————————————————\n"
+        "📅 Дата внесения акции: 25.06\n"
+        "📅 Период проведения: 01.07 - 10.07\n"
+        "————————————————————\n"
+        "🛍 ТОВАРЫ: Чипсы Lay's\nCola 0.5л\n"
+        "Fanta 1л\n"
+        "————————————————————\n"
+        "⚙️ МЕХАНИКА/% скидки: -20%\n"
+        "————————————————————\n"
+        "👥 УЧАСТНИКИ: Все магазины\n"
+        "————————————————————\n"
+        "🙅‍♂️ ИСКЛЮЧЕНИЯ: нет\n"
+        "————————————————————\n"
+        "Есть\n"
+    )
+
+
+def two_sheets():
+    other_rows = [ROWS[0], ["20.06", "28.06 - 03.07", "Сухарики", "-25%", "Все магазины"]]
+    other = SheetOffers("Акции Напитки", parse_offers(other_rows, "Акции Напитки", skip_rows=1, year=YEAR), YEAR, other_rows)
+    return [sheet(), other]
+
+
+def added(selected):
+    return {category: [offer.added for offer in offers] for category, offers in selected.items()}
+
+
+def test_lookups_across_sheets():
+    sheets = two_sheets()
+
+    assert added(starting_on(sheets, date(2025, 6, 28))) == {"Акции Снеки": [], "Акции Напитки": ["20.06"]}
+    assert added(ending_on(sheets, date(2025, 7, 10))) == {"Акции Снеки": ["25.06", "27.06"], "Акции Напитки": []}
+
+
+def test_table_active_on():
+    table = OfferTable(two_sheets())
+
+    # Акции без даты окончания (уточняется, «???») не считаются действующими
+    assert added(table.active_on(date(2025, 7, 3))) == {
+        "Акции Снеки": ["25.06", "26.06", "27.06"],
+        "Акции Напитки": ["20.06"],
+    }
+    assert added(table.active_on(date(2025, 7, 11))) == {"Акции Снеки": [], "Акции Напитки": []}
+
+
+def test_table_overlapping():
+    table = OfferTable(two_sheets())
+
+    assert added(table.overlapping(date(2025, 6, 25), date(2025, 6, 30))) == {
+        "Акции Снеки": [],
+        "Акции Напитки": ["20.06"],
+    }
+    assert added(table.overlapping(date(2025, 7, 6), date(2025, 7, 20))) == {
+        "Акции Снеки": ["25.06", "27.06"],
+        "Акции Напитки": [],
+    }
+
+
+def test_empty_table():
+    empty = SheetOffers("Акции Аромки", [], YEAR)
+
+    assert OfferTable([empty]).active_on(date(2025, 7, 1)) == {"Акции Аромки": []}
@@ -0,0 +1,143 @@
+import re
+
+# === Разбиение текста на сообщения Telegram ===
+# Telegram ограничивает длину сообщения 4096 символами и считает их
+# в единицах UTF-16: эмодзи вне BMP (🥤, 🍀, 📦 …) занимают две единицы.
+
+TELEGRAM_MAX_LENGTH = 4096
+
+
+def utf16_len(text):
+    """
+    Длина строки так, как её считает Telegram (в единицах UTF-16).
+    """
+    return len(text) + sum(1 for char in text if ord(char) > 0xFFFF)
+
+
+# Токены: тег, сущность, перевод строки, пробелы, слово, одиночные «<»/«&»
+_TOKEN = re.compile(r"<[^<>]*>|&#?\w+;|\n|[^\S\n]+|[^<&\s]+|[<&]")
+_TAG_NAME = re.compile(r"<\s*(/?)\s*([a-zA-Z][\w-]*)")
+
+
+def _closing(stack):
+    """
+    Закрывающие теги для открытых элементов (в обратном порядке).
+    """
+    return "".join(f"</{name}>" for name, _ in reversed(stack))
+
+
+def _apply_tag(stack, token):
+    """
+    Обновляет стек открытых элементов после токена-тега.
+    """
+    match = _TAG_NAME.match(token)
+    if not match or token.endswith("/>"):
+        return
+    closing, name = match.group(1), match.group(2).lower()
+    if not closing:
+        stack.append((name, token))
+        return
+    for index in range(len(stack) - 1, -1, -1):
+        if stack[index][0] == name:
+            del stack[index:]
+            return
+
+
+def _tokens(text, limit):
+    """
+    Токены текста; слова длиннее четверти лимита дробятся по символам,
+    чтобы их можно было разрезать.
+    """
+    for token in _TOKEN.findall(text):
+        if token[0] not in "<&" and utf16_len(token) > limit // 4:
+            yield from token
+        else:
+            yield token
+
+
+def pack_blocks(blocks, header="", limit=TELEGRAM_MAX_LENGTH):
+    """
+    Складывает готовые блоки в сообщения не длиннее limit за один проход.
+    Заголовок ставится только в первое сообщение. Блок режется только если
+    он сам по себе длиннее лимита (см. split_text); заголовок и предыдущие
+    блоки тогда остаются в одном сообщении с его началом.
+    """
+    messages = []
+    parts = [header] if header else []
+    size = utf16_len(header)
+
+    for block in blocks:
+        block_len = utf16_len(block)
+
+        if block_len > limit:
+            *full, rest = split_text("".join(parts) + block, limit)
+            messages += full
+            parts, size = [rest], utf16_len(rest)
+            continue
+
+        if size + block_len > limit and parts:
+            messages.append("".join(parts))
+            parts = []
+            size = 0
+
+        parts.append(block)
+        size += block_len
+
+    if parts:
+        messages.append("".join(parts))
+    return messages
+
+
+def split_text(text, limit=TELEGRAM_MAX_LENGTH):
+    """
+    Делит произвольный текст на части не длиннее limit.
+
+    Режет по переводу строки, иначе по пробелу, иначе между символами (если граница
+    строки или слова дала бы часть короче половины лимита) — но никогда
+    внутри HTML-тега (<...>) или сущности (&...;). HTML-элементы, открытые в месте
+    разреза, закрываются в конце части и открываются заново в начале следующей,
+    поэтому каждая часть — корректный HTML для Telegram.
+    """
+    if utf16_len(text) <= limit:
+        return [text]
+
+    chunks = []
+    stack = []      # Открытые элементы: (имя, открывающий тег)
+    parts = []      # Токены текущей части
+    size = 0
+    line_cut = space_cut = None   # Места разреза: (число токенов, размер, открытые элементы)
+
+    def cut_here():
+        return len(parts), size, tuple(stack)
+
+    for token in _tokens(text, limit):
+        token_len = utf16_len(token)
+        new_stack = list(stack)
+        if token[0] == "<":
+            _apply_tag(new_stack, token)
+
+        # Не помещается вместе с закрывающими тегами — отдаём часть до лучшего места разреза
+        if size + token_len + utf16_len(_closing(new_stack)) > limit and parts:
+            # Граница строки или слова — если часть не выйдет короче половины лимита
+            count, cut_size, cut_stack = next(
+                (cut for cut in (line_cut, space_cut) if cut and cut[1] >= limit // 2), cut_here()
+            )
+            reopen = "".join(tag for _, tag in cut_stack)
+            if count and cut_size > utf16_len(reopen):
+                chunks.append("".join(parts[:count]) + _closing(cut_stack))
+                parts = [reopen] + parts[count:] if reopen else parts[count:]
+                size = sum(utf16_len(part) for part in parts)
+                line_cut = space_cut = None
+
+        parts.append(token)
+        size += token_len
+        stack = new_stack
+
+        if token == "\n":
+            line_cut = cut_here()
+        elif token.isspace():
+            space_cut = cut_here()
+
+    if parts:
+        chunks.append("".join(parts))
+    return chunks
@@ -0,0 +1,71 @@
+import logging
+from collections import deque
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from utils.profiling import is_profiling, profile_update
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает апдейты параллельно (не больше max_concurrent_updates чатов сразу),
+    но апдейты одного чата — строго по очереди.
+
+    Так медленный запрос одного сотрудника не задерживает остальных,
+    а user_data/chat_data одного пользователя не меняются из двух апдейтов одновременно
+    (например, ввод даты и нажатие кнопки «на дату»).
+
+    Общий слот занимает только первый апдейт чата: следующие апдейты того же чата
+    встают в его очередь и сразу освобождают слот, а обрабатывает их тот же первый
+    вызов. Поэтому пользователь, много раз нажавший кнопку, держит один слот, а не все.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._queues = {}   # chat_id -> deque ожидающих корутин этого чата
+
+    @staticmethod
+    def _key(update):
+        if isinstance(update, Update):
+            if update.effective_chat:
+                return update.effective_chat.id
+            if update.effective_user:
+                return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        # Профилирование по команде /profile (utils/profiling.py)
+        if is_profiling() and isinstance(update, Update):
+            coroutine = profile_update(coroutine, update.get_bot())
+
+        key = self._key(update)
+        if key is None:
+            await coroutine
+            return
+
+        queue = self._queues.get(key)
+        if queue is not None:
+            # Чат уже обрабатывается — апдейт выполнит тот, кто держит слот этого чата
+            queue.append(coroutine)
+            return
+
+        queue = self._queues[key] = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue[0]
+                except Exception as e:
+                    # Ошибка одного апдейта не должна останавливать очередь чата
+                    logging.error(f"Ошибка при обработке апдейта чата {key}: {e}", exc_info=True)
+                finally:
+                    queue.popleft()
+        finally:
+            # При отмене не оставляем неначатые корутины
+            for pending in queue:
+                pending.close()
+            del self._queues[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -1,8 +1,18 @@
 import os
 import json
+import hashlib
+import asyncio
+import time
+import threading
+import logging
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+import httplib2
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp, Request
+from utils import metrics
 
 # === Загрузка .env (если локально запускаешь) ===
 load_dotenv()
@@ -11,38 +21,475 @@ load_dotenv()
 SCOPES = [os.getenv("SCOPES")]                   # Права доступа
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")     # ID таблицы
 
+# Сколько секунд данные листа считаются свежими
+SHEETS_CACHE_TTL = float(os.getenv("SHEETS_CACHE_TTL", "60"))
+
+# Таймаут HTTP-запросов к Google (секунды)
+SHEETS_HTTP_TIMEOUT = float(os.getenv("SHEETS_HTTP_TIMEOUT", "30"))
+
+# Сколько запросов к Google может выполняться одновременно
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "4"))
+
+# Как Google отдаёт значения ячеек: FORMATTED_VALUE — как в таблице (даты строками).
+# При UNFORMATTED_VALUE/FORMULA числа и даты приходят числами — они приводятся к строкам,
+# но ячейки-даты тогда выглядят как серийные номера, а проценты — как доли
+SHEETS_VALUE_RENDER_OPTION = os.getenv("SHEETS_VALUE_RENDER_OPTION", "FORMATTED_VALUE")
+
+# Какие поля ответа batchGet запрашивать (пусто — все)
+SHEETS_FIELDS = os.getenv("SHEETS_FIELDS", "valueRanges/values")
+
+# Снимок последних загруженных листов: читается при старте и выручает, если Google недоступен
+SHEETS_SNAPSHOT_FILE = Path(os.getenv("SHEETS_SNAPSHOT_FILE", "logs/sheets_snapshot.json"))
+
+# Данные старше этого (секунды) из снимка или после ошибки загрузки — пользователь видит их возраст
+SHEETS_STALE_NOTICE = float(os.getenv("SHEETS_STALE_NOTICE", "600"))
+
+
+# === Общий клиент Google Sheets (создаётся один раз) ===
+_credentials = None
+_service = None
+_service_lock = threading.Lock()
+_thread_local = threading.local()   # HTTP-соединение на каждый поток
+
+
+# === Кэш листов: имя листа -> (время загрузки по monotonic, строки, время загрузки по часам, отпечаток) ===
+_sheet_cache = {}
+_cache_lock = threading.Lock()
+_refreshing = set()   # Листы, которые сейчас обновляются в фоне
+_snapshot_lock = threading.Lock()   # Одна запись снимка за раз
+_inflight = {}        # Листы, которые сейчас загружаются: имя -> Future со строками
+_sheet_ranges = {}    # Диапазоны чтения: имя листа -> "A:F" (по умолчанию — весь лист)
+_fallback = {}        # Листы не из последней загрузки: имя -> "snapshot" (поднят с диска) или "failed" (ошибка загрузки)
+
+# Пул потоков для блокирующих запросов к Google (httplib2 синхронный)
+_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+
+
+def init_google_service():
+    """
+    Создаёт общий авторизованный клиент Google Sheets API.
+    Вызывается один раз при старте бота; повторные вызовы возвращают готовый клиент.
+    """
+    global _credentials, _service
+
+    with _service_lock:
+        if _service is None:
+            token_data = json.loads(os.environ["GOOGLE_TOKEN_JSON"])  # токен
+            _credentials = Credentials.from_authorized_user_info(token_data, SCOPES)
+            # Встроенный discovery-документ: без лишнего сетевого запроса
+            _service = build("sheets", "v4", credentials=_credentials, static_discovery=True)
+        return _service
+
 
 def get_google_service():
     """
-    Создаёт авторизованный объект Google Sheets API,
+    Возвращает общий авторизованный объект Google Sheets API,
     используя переменные окружения вместо token.json.
     """
     try:
-        token_data = json.loads(os.environ["GOOGLE_TOKEN_JSON"])  # токен
-        creds = Credentials.from_authorized_user_info(token_data, SCOPES)
-        return build("sheets", "v4", credentials=creds)
+        return init_google_service()
     except Exception as e:
         print("❌ Ошибка при создании сервиса Google Sheets:", e)
         return None
 
 
-def get_sheet_data(sheet_name):
+def _get_http():
+    """
+    Возвращает keep-alive соединение текущего потока.
+    httplib2 не потокобезопасен, поэтому у каждого потока своё соединение,
+    а учётные данные общие.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        http = AuthorizedHttp(_credentials, http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT))
+        _thread_local.http = http
+
+    # Токен обновляется только когда он истёк
+    with _service_lock:
+        if not _credentials.valid:
+            _credentials.refresh(Request(http.http))
+    return http
+
+
+def set_sheet_ranges(ranges):
+    """
+    Задаёт диапазоны чтения листов {имя листа: "A:F"}, чтобы не загружать лишние колонки и строки.
     """
-    Получает данные с указанного листа Google Таблицы.
+    _sheet_ranges.update(ranges)
+
+
+def _a1_range(sheet_name):
+    sheet_range = _sheet_ranges.get(sheet_name)
+    return f"'{sheet_name}'!{sheet_range}" if sheet_range else f"'{sheet_name}'"
+
+
+def fetch_sheets_data(sheet_names):
     """
+    Загружает несколько листов одним запросом batchGet, минуя кэш.
+    Возвращает словарь {имя листа: строки}. В случае ошибки выбрасывает исключение.
+    """
+    service = get_google_service()
+    if not service:
+        raise RuntimeError("Сервис Google Sheets не инициализирован.")
+
+    params = {
+        "spreadsheetId": SPREADSHEET_ID,
+        "ranges": [_a1_range(sheet_name) for sheet_name in sheet_names],
+        "valueRenderOption": SHEETS_VALUE_RENDER_OPTION,
+    }
+    if SHEETS_FIELDS:
+        params["fields"] = SHEETS_FIELDS
+
+    metrics.inc("sheets_requests_total")
     try:
-        service = get_google_service()
-        if not service:
-            raise RuntimeError("Сервис Google Sheets не инициализирован.")
+        with metrics.timer("sheets_request_seconds"):
+            result = service.spreadsheets().values().batchGet(**params).execute(http=_get_http())
+    except Exception:
+        metrics.inc("sheets_request_errors_total")
+        raise
 
-        range_name = f"'{sheet_name}'"
-        result = service.spreadsheets().values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=range_name
-        ).execute()
+    # Диапазоны возвращаются в том же порядке, в котором были запрошены
+    value_ranges = result.get("valueRanges", [])
+    sheets = {
+        sheet_name: value_range.get("values", [])
+        for sheet_name, value_range in zip(sheet_names, value_ranges)
+    }
 
-        return result.get("values", [])
+    # Разбор листов ждёт строки; FORMATTED_VALUE и так отдаёт только строки
+    if SHEETS_VALUE_RENDER_OPTION != "FORMATTED_VALUE":
+        sheets = {
+            sheet_name: [[cell if isinstance(cell, str) else str(cell) for cell in row] for row in rows]
+            for sheet_name, rows in sheets.items()
+        }
+    return sheets
 
-    except Exception as e:
-        print(f"⚠️ Ошибка при получении данных с листа '{sheet_name}': {e}")
+
+def fetch_sheet_data(sheet_name):
+    """
+    Загружает данные листа напрямую из Google Таблицы, минуя кэш.
+    В случае ошибки выбрасывает исключение.
+    """
+    return fetch_sheets_data([sheet_name]).get(sheet_name, [])
+
+
+def fingerprint(rows):
+    """
+    Отпечаток содержимого листа: одинаковые данные дают одинаковый хэш.
+    """
+    data = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _store(sheets):
+    """
+    Кладёт загруженные листы в кэш, обновляет снимок на диске
+    и возвращает строки в том виде, в каком они лежат в кэше.
+
+    Если содержимое листа не изменилось, в кэше остаётся прежний объект строк:
+    разбор (bot/offers.py) и готовые сообщения (bot/logic.py) привязаны к нему
+    и не пересобираются. Обновляется только время загрузки; снимок на диске
+    перезаписывается, только если изменился хотя бы один лист.
+    """
+    # Хэширование — вне блокировки: кэш не ждёт сериализации больших листов
+    digests = {sheet_name: fingerprint(rows) for sheet_name, rows in sheets.items()}
+
+    now = time.monotonic()
+    wall = time.time()
+    stored = {}
+    changed = False
+    with _cache_lock:
+        for sheet_name, rows in sheets.items():
+            digest = digests[sheet_name]
+            cached = _sheet_cache.get(sheet_name)
+            if cached and cached[3] == digest:
+                rows = cached[1]
+            else:
+                changed = True
+            _sheet_cache[sheet_name] = (now, rows, wall, digest)
+            _fallback.pop(sheet_name, None)
+            stored[sheet_name] = rows
+
+    if changed:
+        save_snapshot()
+    return stored
+
+
+# === Снимок листов на диске ===
+def save_snapshot():
+    """
+    Сохраняет все листы из кэша в SHEETS_SNAPSHOT_FILE (атомарно: временный файл + замена).
+    """
+    with _cache_lock:
+        data = {
+            sheet_name: {"fetched_at": wall, "rows": rows}
+            for sheet_name, (_, rows, wall, _) in _sheet_cache.items()
+        }
+
+    with _snapshot_lock:
+        try:
+            SHEETS_SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = SHEETS_SNAPSHOT_FILE.with_suffix(".json.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"sheets": data}, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, SHEETS_SNAPSHOT_FILE)
+        except OSError as e:
+            logging.error(f"Ошибка при сохранении снимка листов: {e}")
+
+
+def load_snapshot():
+    """
+    Загружает снимок листов в кэш (при старте бота). Листы из снимка
+    сохраняют настоящий возраст: устаревшие отдаются сразу и обновляются в фоне.
+    Возвращает список загруженных листов.
+    """
+    if not SHEETS_SNAPSHOT_FILE.exists():
+        return []
+
+    try:
+        with open(SHEETS_SNAPSHOT_FILE, "r", encoding="utf-8") as f:
+            sheets = json.load(f).get("sheets", {})
+    except (OSError, ValueError) as e:
+        logging.error(f"Ошибка при чтении снимка листов: {e}")
         return []
+
+    digests = {sheet_name: fingerprint(entry.get("rows", [])) for sheet_name, entry in sheets.items()}
+
+    now = time.monotonic()
+    wall = time.time()
+    loaded = []
+    with _cache_lock:
+        for sheet_name, entry in sheets.items():
+            # Уже загруженные из Google данные свежее снимка
+            if sheet_name in _sheet_cache:
+                continue
+            fetched_at = entry.get("fetched_at", 0)
+            rows = entry.get("rows", [])
+            _sheet_cache[sheet_name] = (now - max(wall - fetched_at, 0), rows, fetched_at, digests[sheet_name])
+            _fallback[sheet_name] = "snapshot"
+            loaded.append(sheet_name)
+    return loaded
+
+
+def warm_up(sheet_names):
+    """
+    Прогрев при старте: мгновенно поднимает снимок с диска
+    и запускает загрузку всех листов из Google в фоне.
+    """
+    loaded = load_snapshot()
+    if loaded:
+        print(f"💾 Загружен снимок листов: {', '.join(loaded)}")
+
+    with _cache_lock:
+        sheet_names = [name for name in sheet_names if name not in _refreshing]
+        _refreshing.update(sheet_names)
+
+    if sheet_names:
+        _executor.submit(_refresh_in_background, sheet_names)
+
+
+def get_fallback_state(sheet_names):
+    """
+    Проверяет, отдаются ли листы не из последней загрузки: поднятые из снимка
+    и ещё не обновлённые или оставшиеся в кэше после неудачной загрузки из Google.
+
+    Возвращает (время загрузки самых старых из таких данных по часам, была ли ошибка загрузки)
+    или None, если все листы из кэша загружены из Google последним запросом.
+    """
+    with _cache_lock:
+        fallback = [name for name in sheet_names if name in _fallback and name in _sheet_cache]
+        if not fallback:
+            return None
+        fetched_at = min(_sheet_cache[name][2] for name in fallback)
+        failed = any(_fallback[name] == "failed" for name in fallback)
+    return fetched_at, failed
+
+
+def _fetch_shared(sheet_names):
+    """
+    Загружает листы с объединением одинаковых запросов (single-flight).
+
+    Если лист уже загружается другим потоком, новый запрос к Google не отправляется —
+    вызывающий ждёт тот же результат. Остальные листы загружаются одним batchGet.
+    Возвращает {имя листа: Future со строками}.
+    """
+    futures = {}
+    owned = []
+    with _cache_lock:
+        for sheet_name in sheet_names:
+            future = _inflight.get(sheet_name)
+            if future is None:
+                future = _inflight[sheet_name] = Future()
+                owned.append(sheet_name)
+            else:
+                metrics.inc("sheets_coalesced_total")
+            futures[sheet_name] = future
+
+    if owned:
+        try:
+            fetched = _store(fetch_sheets_data(owned))
+        except Exception as e:
+            with _cache_lock:
+                for sheet_name in owned:
+                    _fallback[sheet_name] = "failed"
+            for sheet_name in owned:
+                futures[sheet_name].set_exception(e)
+        else:
+            for sheet_name in owned:
+                futures[sheet_name].set_result(fetched.get(sheet_name, []))
+        finally:
+            with _cache_lock:
+                for sheet_name in owned:
+                    _inflight.pop(sheet_name, None)
+
+    return futures
+
+
+def _refresh_in_background(sheet_names):
+    """
+    Обновляет листы в фоновом потоке. Пока обновление идёт,
+    пользователи получают предыдущую версию данных.
+    """
+    try:
+        for future in _fetch_shared(sheet_names).values():
+            future.result()
+    except Exception as e:
+        print(f"⚠️ Ошибка фонового обновления листов {sheet_names}: {e}")
+    finally:
+        with _cache_lock:
+            _refreshing.difference_update(sheet_names)
+
+
+def get_sheets_data(sheet_names):
+    """
+    Получает данные нескольких листов Google Таблицы.
+
+    Свежие данные отдаются из кэша. Устаревшие тоже отдаются сразу,
+    а обновление листов запускается в фоне (stale-while-revalidate).
+    Отсутствующие в кэше листы загружаются одним запросом batchGet;
+    одновременные запросы одного листа объединяются в один.
+    """
+    result = {}
+    missing = []
+    stale = []
+
+    with _cache_lock:
+        now = time.monotonic()
+        for sheet_name in sheet_names:
+            cached = _sheet_cache.get(sheet_name)
+            if not cached:
+                missing.append(sheet_name)
+                metrics.inc("sheets_cache_total", result="miss")
+                continue
+
+            fetched_at, rows, _, _ = cached
+            result[sheet_name] = rows
+            if now - fetched_at < SHEETS_CACHE_TTL:
+                metrics.inc("sheets_cache_total", result="hit")
+            else:
+                metrics.inc("sheets_cache_total", result="stale")
+                if sheet_name not in _refreshing:
+                    stale.append(sheet_name)
+
+        _refreshing.update(stale)
+
+    if stale:
+        _executor.submit(_refresh_in_background, stale)
+
+    if missing:
+        for sheet_name, future in _fetch_shared(missing).items():
+            try:
+                result[sheet_name] = future.result()
+            except Exception as e:
+                print(f"⚠️ Ошибка при получении данных с листа {sheet_name}: {e}")
+
+    return {sheet_name: result.get(sheet_name, []) for sheet_name in sheet_names}
+
+
+def refresh_sheets(sheet_names):
+    """
+    Загружает листы из Google в обход кэша (запрос объединяется с уже идущей загрузкой тех же листов).
+    Листы, которые загрузить не удалось, отдаются из кэша.
+    """
+    result = {}
+    for sheet_name, future in _fetch_shared(sheet_names).items():
+        try:
+            result[sheet_name] = future.result()
+        except Exception as e:
+            print(f"⚠️ Не удалось обновить лист {sheet_name}, используются данные из кэша: {e}")
+
+    with _cache_lock:
+        for sheet_name in sheet_names:
+            if sheet_name not in result and sheet_name in _sheet_cache:
+                result[sheet_name] = _sheet_cache[sheet_name][1]
+
+    return {sheet_name: result.get(sheet_name, []) for sheet_name in sheet_names}
+
+
+async def refresh_sheets_async(sheet_names):
+    """
+    Асинхронная версия refresh_sheets: загрузка выполняется в пуле потоков.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, refresh_sheets, sheet_names)
+
+
+def get_sheet_data(sheet_name):
+    """
+    Получает данные с указанного листа Google Таблицы (через кэш).
+    """
+    return get_sheets_data([sheet_name])[sheet_name]
+
+
+async def get_sheets_data_async(sheet_names):
+    """
+    Асинхронная версия get_sheets_data для обработчиков бота.
+    Запрос к Google выполняется в пуле потоков и не блокирует event loop.
+    """
+    with _cache_lock:
+        missing = [sheet_name for sheet_name in sheet_names if sheet_name not in _sheet_cache]
+        inflight = [_inflight[sheet_name] for sheet_name in missing if sheet_name in _inflight]
+
+    # Недостающие листы уже загружаются — ждём их без занятия потока из пула
+    if missing and len(inflight) == len(missing):
+        done, _ = await asyncio.wait([asyncio.wrap_future(future) for future in inflight])
+        for task in done:
+            task.exception()   # Ошибку уже вывел поток, который загружал лист
+
+        with _cache_lock:
+            missing = [sheet_name for sheet_name in missing if sheet_name not in _sheet_cache]
+
+        # Общая загрузка не удалась — не повторяем её сразу же каждым ожидавшим
+        if missing:
+            loaded = [sheet_name for sheet_name in sheet_names if sheet_name not in missing]
+            sheets = get_sheets_data(loaded) if loaded else {}
+            return {sheet_name: sheets.get(sheet_name, []) for sheet_name in sheet_names}
+
+    # Данные уже в кэше — отдаём без переключения в поток
+    if not missing:
+        return get_sheets_data(sheet_names)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, get_sheets_data, sheet_names)
+
+
+async def get_sheet_data_async(sheet_name):
+    """
+    Асинхронная версия get_sheet_data.
+    """
+    sheets = await get_sheets_data_async([sheet_name])
+    return sheets[sheet_name]
+
+
+def invalidate_sheet_cache(sheet_name=None):
+    """
+    Сбрасывает кэш указанного листа (или всех листов, если имя не передано).
+    """
+    with _cache_lock:
+        if sheet_name is None:
+            _sheet_cache.clear()
+            _fallback.clear()
+        else:
+            _sheet_cache.pop(sheet_name, None)
+            _fallback.pop(sheet_name, None)
@@ -0,0 +1,56 @@
+import asyncio
+from http import HTTPStatus
+
+# === Минимальный HTTP/1.1 на asyncio ===
+# Общие чтение запроса и ответ для webhook-сервера (utils/webhook_server.py)
+# и endpoint метрик (utils/metrics.py): одно соединение — один запрос, затем Connection: close.
+
+MAX_BODY_SIZE = 1024 * 1024   # Апдейты Telegram намного меньше
+READ_TIMEOUT = 10             # Секунды на чтение запроса
+
+
+async def respond(writer, status, body=None, content_type="text/plain; charset=utf-8"):
+    """
+    Отправляет ответ и закрывает соединение на стороне клиента (Connection: close).
+    Без body телом служит текст статуса.
+    """
+    if body is None:
+        body = status.phrase.encode()
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+async def _read(reader, max_body):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    method, path, _ = request_line.split(" ", 2)
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", "0"))
+    if length > max_body:
+        raise ValueError("Слишком большой запрос")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+async def read_request(reader, max_body=MAX_BODY_SIZE, timeout=READ_TIMEOUT):
+    """
+    Читает строку запроса, заголовки и тело. Возвращает (метод, путь без query, заголовки, тело).
+    Некорректный, слишком большой или не дочитанный за timeout запрос — ValueError.
+    """
+    try:
+        return await asyncio.wait_for(_read(reader, max_body), timeout)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+        raise ValueError("Запрос не дочитан") from e
+
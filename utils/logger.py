@@ -1,114 +1,229 @@
+import os
+import gzip
+import asyncio
+import queue
+import shutil
 import logging
+import logging.handlers
 from pathlib import Path
-from datetime import datetime 
+from collections import OrderedDict
+from datetime import datetime
 from dotenv import load_dotenv
-import os
 from telegram import Bot
+from utils.user_registry import register_user
 
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 ADMIN_ID = int(os.getenv("ADMIN_ID", 0))  # из .env
-NOTIFY_USER_ID = int(os.getenv("NOTIFY_USER_ID"))  
+NOTIFY_USER_ID = int(os.getenv("NOTIFY_USER_ID"))
 # === Создание папки logs, если её нет ===
 Path("logs").mkdir(parents=True, exist_ok=True)
 
+# === Параметры журнала активности (можно переопределить в .env) ===
+ACTIVITY_LOG_FILE = "logs/user_activity.log"
+ACTIVITY_LOG_MAX_BYTES = int(os.getenv("ACTIVITY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))  # Размер до ротации
+ACTIVITY_LOG_BACKUPS = int(os.getenv("ACTIVITY_LOG_BACKUPS", "10"))                      # Сколько архивов хранить
+ACTIVITY_LOG_BUFFER = int(os.getenv("ACTIVITY_LOG_BUFFER", "50"))                        # Записей в буфере до сброса
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_LOG_FLUSH_INTERVAL", "10"))     # Сброс буфера, секунды
+PERSONAL_LOG_MAX_OPEN = int(os.getenv("PERSONAL_LOG_MAX_OPEN", "64"))                    # Открытых персональных логов
+PERSONAL_LOG_MAX_BYTES = int(os.getenv("PERSONAL_LOG_MAX_BYTES", str(1024 * 1024)))      # Размер персонального лога до ротации
+PERSONAL_LOG_BACKUPS = int(os.getenv("PERSONAL_LOG_BACKUPS", "3"))                       # Сколько его архивов хранить
 
-# === Настройка логгера для записи пользовательской активности ===
-logging.basicConfig(
-    filename="logs/user_activity.log",  # Файл для логов активности
-    level=logging.INFO,                 # Уровень логирования
-    format="%(asctime)s | %(message)s", # Формат: время + сообщение
-    encoding="utf-8"                    # Кодировка
-)
 
+# === Ротация со сжатием: user_activity.log.1.gz, user_activity.log.2.gz, ... ===
+def _gzip_namer(name):
+    return name + ".gz"
 
-def log_user_activity(user_data: dict, action: str):
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+# === Запись в персональный лог пользователя (logs/user_<id>.log) ===
+class PersonalLogHandler(logging.Handler):
     """
-    Логирует информацию о пользователе и его действии.
+    Дописывает строку действия в файл пользователя.
+    Работает в фоновом потоке QueueListener, а не в обработчике бота.
 
-    :param user_data: словарь с данными пользователя Telegram
-    :param action: строка, описывающая действие пользователя
+    Файлы активных пользователей остаются открытыми (LRU-пул не больше max_open):
+    самый давно неиспользованный файл закрывается, когда нужен новый.
+    Буферы сбрасываются периодически (flush) и при закрытии.
+
+    Файл больше max_bytes сжимается в user_<id>.log.1.gz (старые архивы сдвигаются,
+    хранится не больше backups), запись продолжается в новый файл.
+    Ротации по времени нет — только по размеру.
     """
-    try:
-        # Извлечение данных с защитой от отсутствующих ключей
-        user_id = user_data.get("id", "unknown")
-        username = user_data.get("username", "—")
-        first_name = user_data.get("first_name", "")
-        last_name = user_data.get("last_name", "")
 
-        # Формирование строки лога
-        message = (
-            f"UserID: {user_id} | "
-            f"Username: @{username} | "
-            f"Name: {first_name} {last_name} | "
-            f"Action: {action}"
-        )
+    def __init__(self, directory="logs", max_open=PERSONAL_LOG_MAX_OPEN,
+                 max_bytes=PERSONAL_LOG_MAX_BYTES, backups=PERSONAL_LOG_BACKUPS):
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._files = OrderedDict()   # user_id -> открытый файл
+
+    def _path(self, user_id):
+        return self.directory / f"user_{user_id}.log"
+
+    def _get_file(self, user_id):
+        f = self._files.get(user_id)
+        if f is not None:
+            self._files.move_to_end(user_id)
+            return f
+
+        f = open(self._path(user_id), "a", encoding="utf-8")
+        self._files[user_id] = f
+
+        # Закрываем самый давно неиспользованный файл
+        if len(self._files) > self.max_open:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return f
+
+    def _rotate(self, user_id):
+        """
+        Закрывает файл пользователя и сжимает его в .1.gz, сдвигая старые архивы.
+        """
+        self._files.pop(user_id).close()
+        path = self._path(user_id)
+        if self.backups <= 0:
+            path.unlink()
+            return
 
-        # Запись в лог
-        logging.info(message)
+        for index in range(self.backups - 1, 0, -1):
+            older = Path(_gzip_namer(f"{path}.{index}"))
+            if older.exists():
+                os.replace(older, _gzip_namer(f"{path}.{index + 1}"))
+        _gzip_rotator(path, _gzip_namer(f"{path}.1"))
+
+    def emit(self, record):
+        try:
+            line = record.personal_line + "\n"
+            f = self._get_file(record.user_id)
+            # Позиция в файле, открытом на дозапись, — его размер в байтах
+            if self.max_bytes and f.tell() and f.tell() + len(line.encode("utf-8")) > self.max_bytes:
+                self._rotate(record.user_id)
+                f = self._get_file(record.user_id)
+            f.write(line)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            for f in self._files.values():
+                f.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            while self._files:
+                _, f = self._files.popitem()
+                f.close()
+        finally:
+            self.release()
+        super().close()
 
 
-    except Exception as e:
-        # Логирование ошибок логгера (в отдельный log файл можно настроить при необходимости)
-        logging.error(f"Ошибка при логировании активности: {e}")
+# === Настройка логгера для записи пользовательской активности ===
+# Обработчик бота только кладёт запись в очередь; запись на диск,
+# буферизация и ротация выполняются в отдельном потоке (QueueListener).
+_activity_file_handler = logging.handlers.RotatingFileHandler(
+    ACTIVITY_LOG_FILE,                  # Файл для логов активности
+    maxBytes=ACTIVITY_LOG_MAX_BYTES,
+    backupCount=ACTIVITY_LOG_BACKUPS,
+    encoding="utf-8"                    # Кодировка
+)
+_activity_file_handler.namer = _gzip_namer
+_activity_file_handler.rotator = _gzip_rotator
+_activity_file_handler.setFormatter(logging.Formatter("%(asctime)s | %(message)s"))  # Формат: время + сообщение
+
+_activity_buffer = logging.handlers.MemoryHandler(
+    capacity=ACTIVITY_LOG_BUFFER,
+    flushLevel=logging.ERROR,
+    target=_activity_file_handler,
+)
 
+_personal_handler = PersonalLogHandler()
 
-def log_new_user(user_data: dict):
-    """
-    Добавляет нового пользователя в список, если он ещё не записан.
-    """
-    try:
-        user_id = str(user_data.get("id", "unknown"))
-        username = user_data.get("username", "—")
-        first_name = user_data.get("first_name", "")
-        last_name = user_data.get("last_name", "")
+_activity_queue = queue.SimpleQueue()
+_activity_listener = logging.handlers.QueueListener(
+    _activity_queue, _activity_buffer, _personal_handler
+)
+_activity_listener.start()
 
-        # Путь к списку пользователей
-        user_list_path = Path("logs/users_list.log")
-        user_list_path.touch(exist_ok=True)
+activity_logger = logging.getLogger("user_activity")
+activity_logger.setLevel(logging.INFO)
+activity_logger.propagate = False
+activity_logger.addHandler(logging.handlers.QueueHandler(_activity_queue))
 
-        with user_list_path.open("r", encoding="utf-8") as f:
-            existing = f.read()
 
-        # Если ID уже есть в списке — не добавляем
-        if user_id in existing:
-            return
+def flush_activity_log():
+    """
+    Сбрасывает буферы журнала активности и персональных логов на диск
+    (перед отправкой лога, периодически).
+    """
+    _activity_buffer.flush()
+    _personal_handler.flush()
 
-        # Номер по порядку
-        count = existing.strip().count("UserID:") + 1
 
-        entry = (
-            f"#{count}\n"
-            f"UserID: {user_id}\n"
-            f"Username: @{username}\n"
-            f"Name: {first_name} {last_name}\n"
-            f"{'-'*30}\n"
-        )
+async def activity_flush_loop(interval=ACTIVITY_LOG_FLUSH_INTERVAL):
+    """
+    Периодически сбрасывает буфер, чтобы записи не задерживались при малой нагрузке.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(flush_activity_log)
 
-        with user_list_path.open("a", encoding="utf-8") as f:
-            f.write(entry)
 
-    except Exception as e:
-        logging.error(f"Ошибка при логировании нового пользователя: {e}")
+def stop_activity_logging():
+    """
+    Дописывает очередь и буфер и останавливает фоновый поток (при остановке бота).
+    """
+    _activity_listener.stop()
+    _activity_buffer.close()
+    _activity_file_handler.close()
+    _personal_handler.close()
 
 
-async def log_user_action_to_personal_file(user_data: dict, action: str, bot=None):
+async def log_user_action(user_data: dict, action: str, bot=None):
+    """
+    Логирует действие пользователя одной записью: в общий журнал
+    (logs/user_activity.log) и в персональный лог (logs/user_<id>.log).
+
+    :param user_data: словарь с данными пользователя Telegram
+    :param action: строка, описывающая действие пользователя
+    :param bot: если передан — админ получает уведомление о действиях NOTIFY_USER_ID
+    """
     try:
-        user_id = int(user_data.get("id", 0))
+        # Извлечение данных с защитой от отсутствующих ключей
+        user_id = user_data.get("id", "unknown")
         username = user_data.get("username", "—")
         first_name = user_data.get("first_name", "")
         last_name = user_data.get("last_name", "")
 
+        # Строка для общего журнала
+        message = (
+            f"UserID: {user_id} | "
+            f"Username: @{username} | "
+            f"Name: {first_name} {last_name} | "
+            f"Action: {action}"
+        )
+
+        # Строка для персонального лога
         log_line = (
             f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | "
             f"{first_name} {last_name} (@{username}) | {action}"
         )
 
-        # 📁 Сохраняем в персональный лог
-        personal_log_path = Path(f"logs/user_{user_id}.log")
-        personal_log_path.parent.mkdir(parents=True, exist_ok=True)
-        with personal_log_path.open("a", encoding="utf-8") as f:
-            f.write(log_line + "\n")
+        # Запись уходит в очередь, диск — в фоновом потоке
+        activity_logger.info(message, extra={"user_id": user_id, "personal_line": log_line})
 
         # ✅ Уведомляем админа, ТОЛЬКО если:
         # - пользователь в списке разрешённых
@@ -117,4 +232,16 @@ async def log_user_action_to_personal_file(user_data: dict, action: str, bot=Non
             await bot.send_message(chat_id=ADMIN_ID, text=log_line)
 
     except Exception as e:
-        print(f"⚠️ Ошибка при логировании действий пользователя: {e}")
\ No newline at end of file
+        # Логирование ошибок логгера попадает в logs/error.log
+        logging.error(f"Ошибка при логировании активности: {e}")
+
+
+def log_new_user(user_data: dict):
+    """
+    Добавляет нового пользователя в список, если он ещё не записан.
+    Проверка идёт по реестру в памяти (utils/user_registry.py), без чтения файла.
+    """
+    try:
+        register_user(user_data)
+    except Exception as e:
+        logging.error(f"Ошибка при логировании нового пользователя: {e}")
@@ -0,0 +1,187 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from http import HTTPStatus
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from utils.http_server import read_request, respond
+
+# Загружаем переменные окружения из .env файла
+load_dotenv()
+
+# === Метрики производительности ===
+# Счётчики и гистограммы задержек в памяти процесса: /metrics для админа
+# и (если задан METRICS_PORT) текстовый endpoint в формате Prometheus.
+
+# Порт HTTP-endpoint /metrics (0 — выключен)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_counters = {}     # (имя, метки) -> значение
+_histograms = {}   # (имя, метки) -> [счётчики корзин..., сумма, количество]
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """
+    Увеличивает счётчик name с метками labels.
+    """
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """
+    Добавляет значение (секунды) в гистограмму name с метками labels.
+    """
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[index] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    """
+    Замеряет время блока with (в том числе с await внутри) и пишет его в гистограмму.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _quantile(histogram, q):
+    """
+    Оценка квантиля по корзинам (верхняя граница корзины).
+    """
+    count = histogram[-1]
+    if not count:
+        return 0
+    rank = q * count
+    for index, bound in enumerate(BUCKETS):
+        if histogram[index] >= rank:
+            return bound
+    return float("inf")
+
+
+def _format_labels(labels):
+    return ", ".join(f"{name}={value}" for name, value in labels)
+
+
+def render_summary():
+    """
+    Текст для команды /metrics: счётчики и задержки (среднее, p50, p95).
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(value)) for key, value in _histograms.items())
+
+    lines = ["📈 Метрики"]
+    if histograms:
+        lines.append("\n⏱ Задержки (кол-во | среднее | p50 | p95), мс:")
+        for (name, labels), histogram in histograms:
+            count = histogram[-1]
+            average = histogram[-2] / count * 1000 if count else 0
+            p50 = _quantile(histogram, 0.5) * 1000
+            p95 = _quantile(histogram, 0.95) * 1000
+            title = f"{name} [{_format_labels(labels)}]" if labels else name
+            lines.append(f"• {title}: {count} | {average:.0f} | ≤{p50:.0f} | ≤{p95:.0f}")
+
+    if counters:
+        lines.append("\n🔢 Счётчики:")
+        for (name, labels), value in counters:
+            title = f"{name} [{_format_labels(labels)}]" if labels else name
+            lines.append(f"• {title}: {value:g}")
+
+    if len(lines) == 1:
+        lines.append("Пока нет данных.")
+    return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _prometheus_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render_prometheus():
+    """
+    Все метрики в текстовом формате Prometheus.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(value)) for key, value in _histograms.items())
+
+    lines = []
+    typed = set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_prometheus_labels(labels)} {value:g}")
+
+    for (name, labels), histogram in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        for index, bound in enumerate(BUCKETS):
+            lines.append(f"{name}_bucket{_prometheus_labels(labels, [('le', f'{bound:g}')])} {histogram[index]}")
+        lines.append(f"{name}_bucket{_prometheus_labels(labels, [('le', '+Inf')])} {histogram[-1]}")
+        lines.append(f"{name}_sum{_prometheus_labels(labels)} {histogram[-2]:.6f}")
+        lines.append(f"{name}_count{_prometheus_labels(labels)} {histogram[-1]}")
+
+    return "\n".join(lines) + "\n"
+
+
+# === HTTP-endpoint для Prometheus ===
+async def _handle_metrics_request(reader, writer):
+    try:
+        try:
+            method, path, _, _ = await read_request(reader, max_body=0)
+        except ValueError:
+            await respond(writer, HTTPStatus.BAD_REQUEST)
+            return
+
+        if method == "GET" and path == "/metrics":
+            await respond(writer, HTTPStatus.OK, render_prometheus().encode("utf-8"),
+                          content_type="text/plain; version=0.0.4; charset=utf-8")
+        else:
+            await respond(writer, HTTPStatus.NOT_FOUND)
+    except Exception as e:
+        logging.error(f"Ошибка endpoint метрик: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port=METRICS_PORT, listen=METRICS_LISTEN):
+    """
+    Запускает endpoint http://listen:port/metrics. Возвращает сервер или None, если порт не задан.
+    """
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle_metrics_request, listen, port)
+    print(f"📈 Метрики доступны на http://{listen}:{port}/metrics")
+    return server
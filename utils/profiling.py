@@ -0,0 +1,118 @@
+import io
+import pstats
+import logging
+import cProfile
+from pathlib import Path
+from datetime import datetime
+from utils.chunker import split_text
+
+# === Профилирование апдейтов по команде админа (/profile on N) ===
+# Следующие N апдейтов выполняются под cProfile, затем админ получает
+# файл статистики (.prof, открывается в snakeviz/pstats) и список самых долгих функций.
+#
+# cProfile видит только поток event loop: время запросов к Google в пуле потоков
+# отражается как ожидание. Апдейты других пользователей, обработанные одновременно,
+# тоже попадают в профиль.
+
+PROFILE_DIR = Path("logs")
+PROFILE_TOP = 20           # Сколько функций показывать в отчёте
+PROFILE_MAX_UPDATES = 1000
+
+_profile = None
+_remaining = 0     # Сколько апдейтов ещё профилировать
+_active = 0        # Сколько профилируемых апдейтов выполняется сейчас
+_processed = 0     # Сколько апдейтов уже в профиле
+_chat_id = None    # Куда отправить отчёт
+
+
+def start_profiling(count, chat_id):
+    """
+    Включает профилирование следующих count апдейтов. Отчёт уйдёт в chat_id.
+    Возвращает False, если профилирование уже идёт.
+    """
+    global _profile, _remaining, _processed, _chat_id
+
+    if _profile is not None:
+        return False
+
+    _profile = cProfile.Profile()
+    _remaining = max(1, min(count, PROFILE_MAX_UPDATES))
+    _processed = 0
+    _chat_id = chat_id
+    return True
+
+
+async def stop_profiling(bot):
+    """
+    Досрочно завершает профилирование. Отчёт отправляется сразу
+    или после завершения уже начатых апдейтов. Возвращает False, если профилирование не шло.
+    """
+    global _remaining
+
+    if _profile is None:
+        return False
+
+    _remaining = 0
+    if not _active:
+        await _send_report(bot)
+    return True
+
+
+def is_profiling():
+    return _remaining > 0
+
+
+async def profile_update(coroutine, bot):
+    """
+    Выполняет обработку апдейта под профилировщиком (вызывается из PerChatUpdateProcessor).
+    """
+    global _remaining, _active, _processed
+
+    if _remaining <= 0:
+        await coroutine
+        return
+
+    _remaining -= 1
+    profile = _profile
+    if not _active:
+        profile.enable()
+    _active += 1
+
+    try:
+        await coroutine
+    finally:
+        _active -= 1
+        _processed += 1
+        if not _active:
+            profile.disable()
+            if _remaining <= 0:
+                await _send_report(bot)
+
+
+async def _send_report(bot):
+    global _profile
+
+    profile, _profile = _profile, None
+    if profile is None:
+        return
+
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.dump_stats(path)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+        # Шапку pstats пропускаем — начинаем с таблицы функций
+        report = stream.getvalue()
+        report = report[report.find("ncalls"):] if "ncalls" in report else report
+
+        await bot.send_message(chat_id=_chat_id, text=f"🔬 Профиль {_processed} апдейтов (по cumulative):")
+        for part in split_text(report.strip() or "Пусто"):
+            await bot.send_message(chat_id=_chat_id, text=part)
+        with path.open("rb") as f:
+            await bot.send_document(chat_id=_chat_id, document=f)
+    except Exception as e:
+        logging.error(f"Ошибка при отправке профиля: {e}")
@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import timedelta
+from dotenv import load_dotenv
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from utils import metrics
+
+# Загружаем переменные окружения из .env файла
+load_dotenv()
+
+# === Лимиты Telegram (можно переопределить в .env) ===
+# Все чаты вместе: сообщений в секунду
+TG_OVERALL_MAX_RATE = int(os.getenv("TG_OVERALL_MAX_RATE", "30"))
+# Один личный чат: сообщений в минуту (короткие всплески допускаются)
+TG_CHAT_MAX_RATE = int(os.getenv("TG_CHAT_MAX_RATE", "60"))
+# Одна группа: сообщений в минуту
+TG_GROUP_MAX_RATE = int(os.getenv("TG_GROUP_MAX_RATE", "20"))
+# Сколько раз повторять запрос после RetryAfter
+TG_MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", "3"))
+
+
+class _WindowLimiter:
+    """
+    Скользящее окно: не больше max_rate запросов за time_period секунд.
+    Пока лимит не достигнут, запросы проходят без ожидания.
+    """
+    __slots__ = ("max_rate", "time_period", "_sent", "_lock")
+
+    def __init__(self, max_rate, time_period):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= self.time_period:
+                    self._sent.popleft()
+
+                if len(self._sent) < self.max_rate:
+                    self._sent.append(now)
+                    return
+
+                await asyncio.sleep(self.time_period - (now - self._sent[0]))
+
+    def is_idle(self):
+        return not self._sent or time.monotonic() - self._sent[-1] >= self.time_period
+
+
+class TelegramRateLimiter(BaseRateLimiter[int]):
+    """
+    Ограничитель запросов к Telegram для Application.
+
+    Общий лимит на все чаты и отдельный лимит на каждый чат (для групп строже).
+    Ожидание возникает только при приближении к лимитам. При RetryAfter
+    все запросы приостанавливаются на указанное Telegram время и повторяются.
+    """
+
+    def __init__(
+        self,
+        overall_max_rate=TG_OVERALL_MAX_RATE,
+        chat_max_rate=TG_CHAT_MAX_RATE,
+        group_max_rate=TG_GROUP_MAX_RATE,
+        max_retries=TG_MAX_RETRIES,
+    ):
+        self._overall = _WindowLimiter(overall_max_rate, 1) if overall_max_rate else None
+        self._chat_max_rate = chat_max_rate
+        self._group_max_rate = group_max_rate
+        self._max_retries = max_retries
+        self._chats = {}
+        self._retry_after_event = asyncio.Event()
+        self._retry_after_event.set()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _get_chat_limiter(self, chat_id):
+        """
+        Лимитер конкретного чата. Отрицательный id или @username — группа/канал.
+        """
+        limiter = self._chats.get(chat_id)
+        if limiter is None:
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            max_rate = self._group_max_rate if is_group else self._chat_max_rate
+            if not max_rate:
+                return None
+
+            # Давно неактивные чаты не держим в памяти
+            if len(self._chats) > 1000:
+                self._chats = {key: value for key, value in self._chats.items() if not value.is_idle()}
+
+            limiter = self._chats[chat_id] = _WindowLimiter(max_rate, 60)
+        return limiter
+
+    async def _wait_for_budget(self, chat_id):
+        if chat_id is None:
+            return
+
+        chat_limiter = self._get_chat_limiter(chat_id)
+        if chat_limiter:
+            await chat_limiter.acquire()
+        if self._overall:
+            await self._overall.acquire()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        max_retries = rate_limit_args or self._max_retries
+
+        chat_id = data.get("chat_id")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+
+        with metrics.timer("telegram_throttle_seconds"):
+            await self._wait_for_budget(chat_id)
+
+        for attempt in range(max_retries + 1):
+            # После RetryAfter ждём, пока Telegram снова разрешит отправку
+            await self._retry_after_event.wait()
+
+            metrics.inc("telegram_requests_total", endpoint=endpoint)
+            try:
+                with metrics.timer("telegram_request_seconds", endpoint=endpoint):
+                    return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                metrics.inc("telegram_retry_after_total", endpoint=endpoint)
+                if attempt == max_retries:
+                    logging.error(f"Лимит Telegram превышен после {max_retries} повторов ({endpoint})")
+                    raise
+
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+
+                self._retry_after_event.clear()
+                try:
+                    await asyncio.sleep(retry_after + 0.1)
+                finally:
+                    self._retry_after_event.set()
@@ -1,38 +1,135 @@
+import os
 import json
+import asyncio
+import logging
+import threading
 from pathlib import Path
 from datetime import datetime
+from collections import deque
 
 STATS_FILE = Path("logs/stats.json")
 STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
 
+# Сколько последних действий хранить
+LAST_USERS_LIMIT = 20
+# За сколько дней хранить дневные счётчики
+DAYS_KEPT = 31
+# Как часто сбрасывать статистику на диск (секунды)
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "30"))
+
+
+# === Статистика в памяти ===
+# Обновляется на каждом сообщении без обращения к диску,
+# на диск пишется периодически и при остановке бота (flush_stats).
+_lock = threading.Lock()
+_flush_lock = threading.Lock()   # Одна запись на диск за раз
+_state = None
+_dirty = False
+
+
+def _load_state():
+    """
+    Читает stats.json один раз при первом обращении.
+    """
+    global _state
+
+    data = {}
+    if STATS_FILE.exists():
+        try:
+            with open(STATS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Ошибка при чтении статистики: {e}")
+
+    _state = {
+        "total_visits": data.get("total_visits", 0),
+        "last_users": deque(data.get("last_users", []), maxlen=LAST_USERS_LIMIT),
+        "visits_by_day": dict(data.get("visits_by_day", {})),
+        "users_by_day": {day: set(ids) for day, ids in data.get("users_by_day", {}).items()},
+        "visits_by_user": dict(data.get("visits_by_user", {})),
+    }
+
+
+def _ensure_loaded():
+    if _state is None:
+        _load_state()
+
+
 # Обновляем статистику
 def update_stats(user_id, username, action):
-    stats = load_stats()
+    global _dirty
+
+    now = datetime.now()
+    day = now.date().isoformat()
 
-    stats["total_visits"] += 1
-    stats["last_users"].append({
-        "user_id": user_id,
-        "username": username,
-        "action": action,
-        "time": datetime.now().isoformat()
-    })
+    with _lock:
+        _ensure_loaded()
 
-    if len(stats["last_users"]) > 20:
-        stats["last_users"] = stats["last_users"][-20:]
+        _state["total_visits"] += 1
+        _state["last_users"].append({
+            "user_id": user_id,
+            "username": username,
+            "action": action,
+            "time": now.isoformat()
+        })
 
-    save_stats(stats)
+        _state["visits_by_day"][day] = _state["visits_by_day"].get(day, 0) + 1
+        _state["users_by_day"].setdefault(day, set()).add(user_id)
 
-# Загружаем статистику
+        user_key = str(user_id)
+        _state["visits_by_user"][user_key] = _state["visits_by_user"].get(user_key, 0) + 1
+
+        # Старые дни не храним
+        if len(_state["users_by_day"]) > DAYS_KEPT:
+            for old_day in sorted(_state["users_by_day"])[:-DAYS_KEPT]:
+                _state["users_by_day"].pop(old_day, None)
+                _state["visits_by_day"].pop(old_day, None)
+
+        _dirty = True
+
+
+# Загружаем статистику (снимок текущего состояния)
 def load_stats():
-    if STATS_FILE.exists():
-        with open(STATS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {
-        "total_visits": 0,
-        "last_users": []
-    }
+    with _lock:
+        _ensure_loaded()
+        return {
+            "total_visits": _state["total_visits"],
+            "last_users": list(_state["last_users"]),
+            "visits_by_day": dict(_state["visits_by_day"]),
+            "users_by_day": {day: sorted(ids) for day, ids in _state["users_by_day"].items()},
+            "visits_by_user": dict(_state["visits_by_user"]),
+        }
+
 
-# Сохраняем статистику
+# Сохраняем статистику (атомарно: временный файл + замена)
 def save_stats(data):
-    with open(STATS_FILE, "w", encoding="utf-8") as f:
+    tmp_file = STATS_FILE.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, STATS_FILE)
+
+
+# Сбрасываем статистику на диск, если она менялась
+def flush_stats():
+    global _dirty
+
+    with _flush_lock:
+        with _lock:
+            if not _dirty:
+                return
+            _dirty = False
+
+        try:
+            save_stats(load_stats())
+        except Exception as e:
+            _dirty = True
+            logging.error(f"Ошибка при сохранении статистики: {e}")
+
+
+# Периодический сброс статистики (запускается при старте бота)
+async def stats_flush_loop(interval=STATS_FLUSH_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(flush_stats)
@@ -0,0 +1,88 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+
+# === Подписчики ежедневной рассылки ===
+# Список chat_id хранится в памяти и сохраняется в logs/subscribers.json при каждом изменении.
+
+SUBSCRIBERS_FILE = Path("logs/subscribers.json")
+SUBSCRIBERS_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+_subscribers = set()
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_subscribers():
+    """
+    Читает subscribers.json один раз (при старте бота).
+    """
+    global _loaded
+
+    with _lock:
+        if _loaded:
+            return
+
+        if SUBSCRIBERS_FILE.exists():
+            try:
+                with open(SUBSCRIBERS_FILE, "r", encoding="utf-8") as f:
+                    _subscribers.update(int(chat_id) for chat_id in json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logging.error(f"Ошибка при чтении подписчиков: {e}")
+        _loaded = True
+
+
+def _save():
+    """
+    Сохраняет список подписчиков (атомарно: временный файл + замена). Вызывается под _lock.
+    """
+    tmp_file = SUBSCRIBERS_FILE.with_suffix(".json.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(sorted(_subscribers), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, SUBSCRIBERS_FILE)
+
+
+def _update(chat_id, subscribe):
+    load_subscribers()
+
+    with _lock:
+        if (chat_id in _subscribers) == subscribe:
+            return False
+
+        if subscribe:
+            _subscribers.add(chat_id)
+        else:
+            _subscribers.discard(chat_id)
+
+        try:
+            _save()
+        except OSError as e:
+            logging.error(f"Ошибка при сохранении подписчиков: {e}")
+        return True
+
+
+def add_subscriber(chat_id) -> bool:
+    """
+    Подписывает чат на рассылку. Возвращает False, если он уже подписан.
+    """
+    return _update(int(chat_id), True)
+
+
+def remove_subscriber(chat_id) -> bool:
+    """
+    Отписывает чат от рассылки. Возвращает False, если он не был подписан.
+    """
+    return _update(int(chat_id), False)
+
+
+def get_subscribers():
+    """
+    Список подписанных chat_id.
+    """
+    load_subscribers()
+    with _lock:
+        return sorted(_subscribers)
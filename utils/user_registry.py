@@ -0,0 +1,84 @@
+import re
+import logging
+import threading
+from pathlib import Path
+
+# === Реестр пользователей ===
+# Файл logs/users_list.log остаётся источником истины (дописывается в конец),
+# а в памяти держится множество известных ID: проверка нового пользователя — O(1).
+
+USERS_LIST_FILE = Path("logs/users_list.log")
+USERS_LIST_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+_USER_ID_LINE = re.compile(r"^UserID:\s*(\d+)\s*$")
+
+_known_ids = set()
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_registry():
+    """
+    Читает users_list.log один раз (при старте бота) и заполняет множество ID.
+    """
+    global _loaded
+
+    with _lock:
+        if _loaded:
+            return
+
+        if USERS_LIST_FILE.exists():
+            with USERS_LIST_FILE.open("r", encoding="utf-8") as f:
+                for line in f:
+                    match = _USER_ID_LINE.match(line)
+                    if match:
+                        _known_ids.add(int(match.group(1)))
+        _loaded = True
+
+
+def register_user(user_data: dict) -> bool:
+    """
+    Добавляет пользователя в реестр, если его там ещё нет.
+    Возвращает True, если пользователь новый.
+    """
+    load_registry()
+
+    try:
+        user_id = int(user_data.get("id"))
+    except (TypeError, ValueError):
+        return False
+
+    with _lock:
+        if user_id in _known_ids:
+            return False
+
+        username = user_data.get("username", "—")
+        first_name = user_data.get("first_name", "")
+        last_name = user_data.get("last_name", "")
+
+        # Номер по порядку
+        entry = (
+            f"#{len(_known_ids) + 1}\n"
+            f"UserID: {user_id}\n"
+            f"Username: @{username}\n"
+            f"Name: {first_name} {last_name}\n"
+            f"{'-'*30}\n"
+        )
+
+        try:
+            with USERS_LIST_FILE.open("a", encoding="utf-8") as f:
+                f.write(entry)
+        except OSError as e:
+            logging.error(f"Ошибка при записи нового пользователя: {e}")
+            return False
+
+        _known_ids.add(user_id)
+        return True
+
+
+def user_count() -> int:
+    """
+    Количество уникальных пользователей за всё время.
+    """
+    load_registry()
+    return len(_known_ids)
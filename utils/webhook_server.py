@@ -0,0 +1,106 @@
+import hmac
+import json
+import signal
+import asyncio
+import logging
+from functools import partial
+from http import HTTPStatus
+from telegram import Update
+from utils.http_server import read_request, respond
+
+# === Режим webhook ===
+# Небольшой HTTP-сервер на asyncio: принимает POST с Update от Telegram
+# (или от reverse proxy), проверяет секретный токен и кладёт апдейт в очередь Application.
+#
+# Локальная проверка без Telegram (WEBHOOK_URL не задан — setWebhook не вызывается):
+#   curl -X POST http://127.0.0.1:8443/telegram \
+#        -H "Content-Type: application/json" \
+#        -H "X-Telegram-Bot-Api-Secret-Token: <WEBHOOK_SECRET>" \
+#        --data @update.json
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+async def _handle_connection(application, url_path, secret_token, reader, writer):
+    try:
+        try:
+            method, path, headers, body = await read_request(reader)
+        except ValueError:
+            await respond(writer, HTTPStatus.BAD_REQUEST)
+            return
+
+        if path != url_path:
+            await respond(writer, HTTPStatus.NOT_FOUND)
+            return
+        if method != "POST":
+            await respond(writer, HTTPStatus.METHOD_NOT_ALLOWED)
+            return
+        if secret_token and not hmac.compare_digest(headers.get(SECRET_HEADER, ""), secret_token):
+            await respond(writer, HTTPStatus.FORBIDDEN)
+            return
+
+        try:
+            update = Update.de_json(json.loads(body), application.bot)
+        except Exception as e:
+            logging.error(f"Некорректный апдейт в webhook: {e}")
+            await respond(writer, HTTPStatus.BAD_REQUEST)
+            return
+
+        # Обработка идёт в Application, Telegram сразу получает ответ
+        await application.update_queue.put(update)
+        await respond(writer, HTTPStatus.OK)
+
+    except Exception as e:
+        logging.error(f"Ошибка webhook-сервера: {e}")
+    finally:
+        writer.close()
+
+
+async def serve_webhook(application, listen, port, url_path, secret_token=None, webhook_url=None):
+    """
+    Запускает Application в режиме webhook и работает до SIGINT/SIGTERM.
+
+    webhook_url — публичный адрес для setWebhook. Если не задан, setWebhook не вызывается
+    (локальная проверка или адрес уже зарегистрирован). Бот рассчитан на один процесс:
+    несколько воркеров за reverse proxy разослали бы сводку по разу каждый и перезаписывали бы
+    общие файлы (статистика, подписчики, реестр пользователей), а лимит Telegram считался бы отдельно.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    if not url_path.startswith("/"):
+        url_path = f"/{url_path}"
+
+    async with application:   # initialize() ... shutdown()
+        if application.post_init:
+            await application.post_init(application)
+
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES,
+            )
+
+        await application.start()
+        server = await asyncio.start_server(
+            partial(_handle_connection, application, url_path, secret_token), listen, port
+        )
+        print(f"🌐 Webhook слушает http://{listen}:{port}{url_path}")
+
+        try:
+            await stop_event.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+
+    if application.post_shutdown:
+        await application.post_shutdown(application)